@@ -0,0 +1,92 @@
+"""Compara el parser actual de Atmos con el camino anterior (preview + sniffer).
+
+Uso:
+    uv run projects/atmos/benchmarks/bench_load.py --rows 200000 --cols 80
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.data import _parse  # noqa: E402
+
+
+def load_legacy(file_bytes, filename):
+    """Copia del camino previo a la inferencia de esquema en una sola pasada."""
+    data = BytesIO(file_bytes)
+    preview = pd.read_csv(data, nrows=5)
+    data.seek(0)
+    date_cols = [
+        c
+        for c in preview.columns
+        if c.lower() == "t"
+        or any(x in c.lower() for x in ["timestamp", "date", "time", "fecha"])
+    ]
+    df = pd.read_csv(data, parse_dates=date_cols) if date_cols else pd.read_csv(data)
+    df.columns = df.columns.str.strip()
+    for c in df.columns:
+        is_potential_date = False
+        if df[c].dtype == object or pd.api.types.is_numeric_dtype(df[c]):
+            if c.lower() == "t" or any(
+                x in c.lower() for x in ["timestamp", "date", "time"]
+            ):
+                is_potential_date = True
+        if is_potential_date or pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c], utc=True, errors="coerce")
+            if df[c].dt.tz is not None:
+                df[c] = df[c].dt.tz_localize(None)
+            continue
+        if df[c].dtype == object:
+            sample = df[c].dropna().head(50)
+            if not sample.empty and sample.astype(str).str.match(r"^-?\d+(\.\d+)?$").all():
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+def make_wide_csv(rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {
+        "timestamp": pd.date_range("2024-01-01", periods=rows, freq="s").strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),
+        "equipo": rng.choice([f"CAEX-{i:03d}" for i in range(40)], rows),
+    }
+    for i in range(cols):
+        data[f"sensor_{i:03d}"] = rng.normal(size=rows).round(4)
+    return pd.DataFrame(data).to_csv(index=False).encode("utf-8")
+
+
+def bench(fn, payload, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(payload, "bench.csv")
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de Atmos.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = make_wide_csv(args.rows, args.cols)
+    print(f"CSV: {args.rows:,} filas x {args.cols + 2} columnas ({len(payload) / 1e6:.1f} MB)")
+
+    t_legacy = bench(load_legacy, payload, args.repeat)
+    t_new = bench(_parse, payload, args.repeat)
+    print(f"legacy : {t_legacy:8.3f} s")
+    print(f"actual : {t_new:8.3f} s  (x{t_legacy / t_new:.1f})")
+
+
+if __name__ == "__main__":
+    main()
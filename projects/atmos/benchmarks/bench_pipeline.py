@@ -0,0 +1,304 @@
+"""Mide cada etapa del camino de datos de Atmos sin Streamlit.
+
+Genera datasets sintéticos de flota (GPS) o meteorología en CSV/XLSX, corre
+carga -> roles -> índice -> filtros -> reducción visual -> métricas y guarda
+tiempo y memoria pico por etapa en un historial JSON para detectar regresiones.
+
+Uso:
+    uv run projects/atmos/benchmarks/bench_pipeline.py --rows 100000 1000000
+    uv run projects/atmos/benchmarks/bench_pipeline.py --kind weather --format xlsx
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+# La cache en disco de Atmos no debe contaminar (ni acelerar) las mediciones
+os.environ.setdefault("ATMOS_CACHE_DIR", tempfile.mkdtemp(prefix="atmos-bench-"))
+
+from core.data import _parse, detect_roles_fast, load_data_fast  # noqa: E402
+from core.downsample import downsample_positions  # noqa: E402
+from core.export import frame_chunks, write_export  # noqa: E402
+from core.index import FilterIndex, sort_by_time  # noqa: E402
+from core.spatial import GridIndex, keep_filter  # noqa: E402
+from core.stats import BlockStats, range_metrics, slice_metrics  # noqa: E402
+from core.trajectory import build_trajectories  # noqa: E402
+
+HISTORY = Path(__file__).resolve().parent / "history.json"
+XLSX_MAX_ROWS = 1_048_575
+GEN_CHUNK = 1_000_000
+REGRESSION = 1.2  # 20% más lento que la corrida anterior comparable
+
+
+# =============================================================================
+# DATASETS SINTÉTICOS
+# =============================================================================
+def _gps_chunk(rng, start, rows, entities, step_s):
+    ent = rng.integers(0, entities, rows)
+    t = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        (start + np.arange(rows)) * step_s, unit="s"
+    )
+    speed = np.clip(rng.normal(25, 10, rows), 0, None)
+    speed[rng.random(rows) < 0.15] = 0.0  # detenciones
+    return pd.DataFrame(
+        {
+            "timestamp": t.strftime("%Y-%m-%d %H:%M:%S"),
+            "equipo": np.char.add("CAEX-", np.char.zfill(ent.astype(str), 3)),
+            "x": 350_000 + rng.normal(0, 2_000, rows).round(2),
+            "y": 7_500_000 + rng.normal(0, 2_000, rows).round(2),
+            "z": 2_800 + rng.normal(0, 50, rows).round(2),
+            "speed": speed.round(2),
+        }
+    )
+
+
+def _weather_chunk(rng, start, rows, entities, step_s):
+    ent = rng.integers(0, entities, rows)
+    t = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        (start + np.arange(rows)) * step_s, unit="s"
+    )
+    return pd.DataFrame(
+        {
+            "fecha": t.strftime("%d/%m/%Y %H:%M:%S"),
+            "estacion": np.char.add("EST-", ent.astype(str)),
+            "temperatura": rng.normal(12, 8, rows).round(1),
+            "humedad": rng.uniform(5, 95, rows).round(1),
+            "viento": np.abs(rng.normal(6, 4, rows)).round(1),
+            "presion": rng.normal(760, 5, rows).round(1),
+        }
+    )
+
+
+GENERATORS = {"gps": _gps_chunk, "weather": _weather_chunk}
+
+
+def make_dataset(path, kind, rows, entities, seed=0):
+    """Escribe por bloques: generar 50M filas no requiere 50M filas en memoria."""
+    rng = np.random.default_rng(seed)
+    gen = GENERATORS[kind]
+    step_s = 1 if kind == "gps" else 60
+    if path.suffix == ".xlsx":
+        if rows > XLSX_MAX_ROWS:
+            raise ValueError(f"XLSX admite a lo sumo {XLSX_MAX_ROWS:,} filas")
+        gen(rng, 0, rows, entities, step_s).to_excel(path, index=False)
+        return path
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, GEN_CHUNK):
+            chunk = gen(rng, start, min(GEN_CHUNK, rows - start), entities, step_s)
+            chunk.to_csv(f, index=False, header=start == 0)
+    return path
+
+
+# =============================================================================
+# MEDICIÓN POR ETAPA
+# =============================================================================
+def _status_mb(field):
+    """VmRSS / VmHWM de /proc (Linux). Incluye memoria de Arrow, no solo Python."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Fuera de Linux: pico del proceso completo (no se puede reiniciar)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def _reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")  # reinicia VmHWM
+    except OSError:
+        pass
+
+
+class Stages:
+    def __init__(self):
+        self.results = {}
+
+    def run(self, name, fn):
+        _reset_peak()
+        before = _status_mb("VmRSS")
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        peak = _status_mb("VmHWM")
+        self.results[name] = {
+            "seconds": round(elapsed, 4),
+            "peak_mb": round(peak, 1),
+            "delta_mb": round(peak - before, 1),
+        }
+        print(
+            f"  {name:<20} {elapsed:9.3f} s   pico {peak:9.1f} MB"
+            f"   ({peak - before:+,.1f} MB)"
+        )
+        return out
+
+
+def run_pipeline(path, n_points=2000):
+    payload = path.read_bytes()
+    stages = Stages()
+
+    df = stages.run("parse", lambda: _parse(payload, path.name))
+    if not isinstance(df, pd.DataFrame):
+        raise RuntimeError(df)
+    stages.run("load_cold", lambda: load_data_fast(payload, path.name))
+    stages.run("load_cache_hit", lambda: load_data_fast(payload, path.name))
+
+    roles = stages.run("detect_roles", lambda: detect_roles_fast(df))
+    df = stages.run("sort_by_time", lambda: sort_by_time(df, roles))
+    index = stages.run("filter_index", lambda: FilterIndex(df, roles))
+
+    # Filtros de render_sidebar: mitad de las entidades, tramo central del tiempo
+    tmin, tmax = index.time_bounds()
+    ents = index.entities[: max(len(index.entities) // 2, 1)]
+    trange = None
+    if tmin is not None:
+        span = tmax - tmin
+        trange = (tmin + span * 0.25, tmin + span * 0.75)
+    view = stages.run("filter_time", lambda: index.select(df, None, trange))
+    view = stages.run("filter_entities", lambda: index.select(df, ents, trange))
+
+    x, y = roles["spatial"]["x"], roles["spatial"]["y"]
+    y_col = y or (roles["numeric"][0] if roles["numeric"] else None)
+    stages.run("sample_random", lambda: view.sample(min(50_000, len(view))))
+    if roles["time"] and y_col:
+        stages.run(
+            "downsample_lttb",
+            lambda: downsample_positions(
+                view, roles["time"], y_col, roles["entity"], n_points
+            ),
+        )
+    if x and y:
+        grid = stages.run(
+            "grid_index", lambda: GridIndex(df[x].to_numpy(), df[y].to_numpy())
+        )
+        stages.run(
+            "grid_query",
+            lambda: grid.query(None, keep_filter(*index.positions(ents, trange))),
+        )
+        if roles["entity"] and roles["time"]:
+            stages.run("trajectories", lambda: build_trajectories(df, roles, index))
+
+    cols = [c for c in [roles["time"], x, y, roles["entity"]] if c]
+    cols += roles["numeric"][:2]
+    stages.run("metrics_slice", lambda: slice_metrics(view, "SELECCIÓN", cols))
+    lo, hi, _ = index.positions(None, trange)
+    blocks = BlockStats(len(df))
+    stages.run(
+        "metrics_blocks_cold",
+        lambda: range_metrics(blocks, df, "GLOBAL", cols, lo, hi),
+    )
+    stages.run(
+        "metrics_blocks_warm",
+        lambda: range_metrics(blocks, df, "GLOBAL", cols, lo, hi),
+    )
+    stages.run("export_csv", lambda: write_export(frame_chunks(view), "CSV"))
+
+    return {"rows": len(df), "stages": stages.results}
+
+
+# =============================================================================
+# HISTORIAL
+# =============================================================================
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def load_history(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+
+
+def compare(previous, current):
+    """Etapas al menos REGRESSION veces más lentas que la corrida anterior."""
+    slower = []
+    for name, res in current["stages"].items():
+        old = previous["stages"].get(name)
+        if old and old["seconds"] > 0.01:
+            ratio = res["seconds"] / old["seconds"]
+            if ratio >= REGRESSION:
+                slower.append((name, old["seconds"], res["seconds"], ratio))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por etapas de Atmos.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--entities", type=int, default=40)
+    parser.add_argument("--kind", choices=list(GENERATORS), default="gps")
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--data-dir", type=Path, default=None)
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--no-history", action="store_true")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or Path(tempfile.mkdtemp(prefix="atmos-data-"))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    history = load_history(args.history)
+
+    for rows in args.rows:
+        path = data_dir / f"{args.kind}_{rows}_{args.entities}.{args.format}"
+        if not path.exists():
+            print(f"Generando {path.name} ...")
+            make_dataset(path, args.kind, rows, args.entities)
+        print(f"{path.name}: {path.stat().st_size / 1e6:,.1f} MB")
+
+        result = run_pipeline(path)
+        record = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "kind": args.kind,
+            "format": args.format,
+            "entities": args.entities,
+            **result,
+        }
+        same = [
+            r
+            for r in history
+            if (r["kind"], r["format"], r["entities"], r["rows"])
+            == (args.kind, args.format, args.entities, record["rows"])
+        ]
+        if same:
+            for name, old, new, ratio in compare(same[-1], record):
+                print(
+                    f"  ⚠️ {name}: {old:.3f} s -> {new:.3f} s (x{ratio:.2f}) "
+                    f"vs {same[-1]['commit']}"
+                )
+        history.append(record)
+
+    if not args.no_history:
+        args.history.write_text(json.dumps(history, indent=1), encoding="utf-8")
+        print(f"Historial: {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,62 @@
+import pandas as pd
 import streamlit as st
-from state.session import init_session
+from state.session import init_session, profile, start_profiling
 from ui.calculator import render_calculator
+from ui.debug import render_profile
 from ui.sidebar import render_sidebar
 from ui.styles import CSS
+from ui.trajectories import render_trajectories
 from ui.visuals import render_visuals
 
-# =============================================================================
-# 0. CONFIGURACIÓN
-# =============================================================================
-st.set_page_config(page_title="Atmos Studio — Persistent", layout="wide")
-st.markdown(CSS, unsafe_allow_html=True)
-
-# =============================================================================
-# 1. INIT SESSION
-# =============================================================================
-init_session()
-
-# =============================================================================
-# 2. SIDEBAR & DATA LOADING
-# =============================================================================
-df = render_sidebar()
-
-# =============================================================================
-# 3. MAIN APP
-# =============================================================================
-if df is not None:
-    render_calculator()
-    render_visuals(df, st.session_state.roles)
+# Las sesiones trabajan sobre copias superficiales del dataset compartido
+# (core.registry): con copy-on-write sus columnas nuevas no tocan la base.
+# Opcional en pandas 2.x; desde 3.0 siempre está activo.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def main():
+    # =========================================================================
+    # 0. CONFIGURACIÓN
+    # =========================================================================
+    st.set_page_config(page_title="Atmos Studio — Persistent", layout="wide")
+    st.markdown(CSS, unsafe_allow_html=True)
+
+    # =========================================================================
+    # 1. INIT SESSION
+    # =========================================================================
+    init_session()
+    profiler = start_profiling()
+
+    try:
+        # =====================================================================
+        # 2. SIDEBAR & DATA LOADING
+        # =====================================================================
+        with profile("sidebar"):
+            df = render_sidebar()
+
+        # =====================================================================
+        # 3. MAIN APP
+        # =====================================================================
+        if df is not None:
+            if st.session_state.store is None:
+                with profile("calculator"):
+                    render_calculator()
+            else:
+                st.info("🧮 Calculadora no disponible en modo out-of-core.")
+            with profile("visuals"):
+                render_visuals(df, st.session_state.roles)
+            if st.session_state.trajectories is not None:
+                with profile("trajectories"):
+                    render_trajectories()
+        if profiler is not None:
+            render_profile(profiler)
+    finally:
+        # También corre con st.stop() / st.rerun() (excepciones de control)
+        if profiler is not None:
+            profiler.flush()
+
+
+# Los procesos de ingesta (core.multi) importan este script como __mp_main__
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+# =============================================================================
+# CACHE EN DISCO (PARQUET) INDEXADA POR HUELLA DE CONTENIDO
+# =============================================================================
+CACHE_DIR = Path(os.environ.get("ATMOS_CACHE_DIR", Path.home() / ".cache" / "atmos"))
+CACHE_MAX_BYTES = int(os.environ.get("ATMOS_CACHE_MAX_MB", "4096")) * 1024**2
+# Almacenes por bloques (core.store): comparten el presupuesto de CACHE_MAX_BYTES
+STORE_DIR = CACHE_DIR / "stores"
+
+# Se incrementa cuando cambia el parser: invalida entradas antiguas.
+PARSER_VERSION = 2
+
+_BLOCK = 8 * 1024**2  # bytes por update: blake2b suelta el GIL en cada bloque
+
+
+def fingerprint(buf, filename) -> str:
+    """Huella del contenido completo (blake2b en bloques) + extensión + versión."""
+    view = memoryview(buf).cast("B")
+    size = view.nbytes
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{PARSER_VERSION}|{size}|{Path(filename).suffix.lower()}".encode())
+    for start in range(0, size, _BLOCK):
+        h.update(view[start : start + _BLOCK])
+    view.release()
+    return h.hexdigest()
+
+
+def fingerprint_file(path) -> str:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return fingerprint(b"", path)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return fingerprint(mm, path)
+
+
+def _paths(fp):
+    return CACHE_DIR / f"{fp}.parquet", CACHE_DIR / f"{fp}.json"
+
+
+def get(fp):
+    data_path, _ = _paths(fp)
+    if not data_path.exists():
+        return None
+    try:
+        df = pd.read_parquet(data_path)
+    except Exception:
+        data_path.unlink(missing_ok=True)
+        return None
+    # LRU: el mtime marca el último acceso
+    data_path.touch()
+    return df
+
+
+def put(fp, df, meta=None):
+    data_path, _ = _paths(fp)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_suffix(".tmp")
+        df.to_parquet(tmp, engine="pyarrow", index=False)
+        os.replace(tmp, data_path)
+        if meta is not None:
+            put_meta(fp, meta)
+    except Exception:
+        # Columnas no serializables (objetos mixtos, etc.): la cache es opcional
+        data_path.with_suffix(".tmp").unlink(missing_ok=True)
+        return False
+    _evict()
+    return True
+
+
+def get_meta(fp):
+    _, meta_path = _paths(fp)
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def put_meta(fp, meta):
+    _, meta_path = _paths(fp)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = meta_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def _entries():
+    """(mtime, bytes, ruta) de cada entrada: Parquet sueltos y almacenes por bloques."""
+    entries = []
+    for p in CACHE_DIR.glob("*.parquet"):
+        try:
+            st_ = p.stat()
+        except OSError:
+            continue
+        entries.append((st_.st_mtime, st_.st_size, p))
+    # En los almacenes el mtime de meta.json marca el último acceso
+    for meta in STORE_DIR.glob("*/meta.json"):
+        try:
+            mtime = meta.stat().st_mtime
+            size = sum(f.stat().st_size for f in meta.parent.iterdir())
+        except OSError:
+            continue
+        entries.append((mtime, size, meta.parent))
+    return entries
+
+
+def _evict(keep=None):
+    """Borra por LRU hasta quedar bajo CACHE_MAX_BYTES; `keep` nunca se borra."""
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        if p == keep:
+            continue
+        if p.is_dir():
+            shutil.rmtree(p, ignore_errors=True)
+        else:
+            p.unlink(missing_ok=True)
+            p.with_suffix(".json").unlink(missing_ok=True)
+        total -= size
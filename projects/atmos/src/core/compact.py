@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# COMPACTACIÓN DE MEMORIA (CATEGORY / FLOAT32 / INT32)
+# =============================================================================
+# Solo se baja a 32 bits; la calculadora sube los enteros a int64 antes de operar
+# (core.derived.evaluate), así int32 no desborda en las fórmulas.
+_I32 = np.iinfo(np.int32)
+
+
+def _fits_float32(values, rtol):
+    v32 = values.astype(np.float32)
+    if not np.isfinite(v32[np.isfinite(values)]).all():
+        return False
+    if rtol == 0:
+        return np.array_equal(v32.astype(np.float64), values, equal_nan=True)
+    return np.allclose(v32, values, rtol=rtol, atol=0, equal_nan=True)
+
+
+def compact_frame(df, roles, rtol=0.0):
+    """Compacta df en sitio. Devuelve un reporte por columna (bytes antes/después)."""
+    before = df.memory_usage(deep=True, index=False)
+
+    if roles["entity"] and roles["entity"] in df.columns:
+        if not isinstance(df[roles["entity"]].dtype, pd.CategoricalDtype):
+            df[roles["entity"]] = df[roles["entity"]].astype("category")
+
+    # Coordenadas espaciales fuera: float32 pierde precisión en UTM
+    for c in roles["numeric"]:
+        if c not in df.columns:
+            continue
+        s = df[c]
+        if not isinstance(s.dtype, np.dtype):
+            continue  # dtypes nullable/extension se dejan igual
+        if pd.api.types.is_integer_dtype(s) and s.dtype.itemsize > 4:
+            if s.empty or (s.min() >= _I32.min and s.max() <= _I32.max):
+                df[c] = s.astype(np.int32)
+        elif pd.api.types.is_float_dtype(s) and s.dtype.itemsize > 4:
+            if _fits_float32(s.to_numpy(), rtol):
+                df[c] = s.astype(np.float32)
+
+    after = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({"Antes (MB)": before / 1024**2, "Después (MB)": after / 1024**2})
+    report = report[report["Antes (MB)"] != report["Después (MB)"]]
+    report.loc["TOTAL"] = [before.sum() / 1024**2, after.sum() / 1024**2]
+    return report.round(2)
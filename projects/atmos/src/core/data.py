@@ -1,71 +1,165 @@
-from io import BytesIO
+import csv
+from io import BytesIO, StringIO
 import pandas as pd
-import streamlit as st
 from typing import TypedDict, List, Optional
 
+from core import cache
+from core.sketch import approx_nunique
 
-@st.cache_data(show_spinner=False)
-def load_data_fast(file_bytes, filename):
+
+def load_data_fast(file_bytes, filename, fingerprint=None):
+    fp = fingerprint or cache.fingerprint(file_bytes, filename)
+    df = cache.get(fp)
+    if df is not None:
+        return df
+    df = _parse(file_bytes, filename)
+    if isinstance(df, pd.DataFrame):
+        cache.put(fp, df)
+    return df
+
+
+# =============================================================================
+# INFERENCIA DE ESQUEMA (UNA SOLA PASADA)
+# =============================================================================
+SCHEMA_SAMPLE_BYTES = 256 * 1024
+DATE_HINTS = ["timestamp", "date", "time", "fecha"]
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+]
+_NUMERIC_RE = r"^-?\d+(\.\d+)?([eE][-+]?\d+)?$"
+
+
+def is_date_name(col):
+    cl = col.strip().lower()
+    return cl == "t" or any(x in cl for x in DATE_HINTS)
+
+
+def _guess_date_format(sample):
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+        if parsed.notna().all():
+            return fmt
+    return None
+
+
+def infer_schema(sample_df):
+    """Recibe una muestra en texto (dtype=str) y decide fechas y numéricos."""
+    schema = {"dates": {}, "numeric": {}}
+    for c in sample_df.columns:
+        sample = sample_df[c].dropna().astype(str).str.strip()
+        sample = sample[sample != ""]
+        if sample.empty:
+            continue
+        is_num = sample.str.match(_NUMERIC_RE).all()
+        if is_date_name(c):
+            if is_num:
+                # Epoch numérico: la magnitud decide la unidad
+                mx = pd.to_numeric(sample).abs().max()
+                schema["dates"][c] = "s" if mx < 1e11 else "ms" if mx < 1e14 else "ns"
+                continue
+            fmt = _guess_date_format(sample)
+            if fmt or pd.to_datetime(sample, errors="coerce", format="mixed").notna().any():
+                schema["dates"][c] = fmt
+                continue
+        if is_num:
+            is_int = not sample.str.contains(r"[.eE]").any()
+            schema["numeric"][c] = "int" if is_int else "float64"
+    return schema
+
+
+def sniff_csv(head):
+    text = head.decode("utf-8", errors="ignore")
+    lines = text.splitlines()
+    if len(lines) > 1 and not text.endswith(("\n", "\r")):
+        lines = lines[:-1]  # última línea truncada
+    try:
+        sep = csv.Sniffer().sniff("\n".join(lines[:50]), delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    sample_df = pd.read_csv(StringIO("\n".join(lines)), sep=sep, dtype=str)
+    return sep, sample_df
+
+
+def _to_datetime(s, fmt):
+    if pd.api.types.is_datetime64_any_dtype(s):
+        out = s
+    elif fmt in ("s", "ms", "ns"):
+        out = pd.to_datetime(pd.to_numeric(s, errors="coerce"), unit=fmt)
+    elif fmt:
+        out = pd.to_datetime(s, format=fmt, errors="coerce")
+        if out.isna().sum() > s.isna().sum():
+            out = pd.to_datetime(s, utc=True, errors="coerce", format="mixed")
+    else:
+        out = pd.to_datetime(s, utc=True, errors="coerce", format="mixed")
+    if out.dt.tz is not None:
+        out = out.dt.tz_convert("UTC").dt.tz_localize(None)
+    return out
+
+
+def _read_csv(data, sep, schema):
+    # Los enteros se dejan al motor (pueden traer nulos); float explícito
+    dtypes = {c: t for c, t in schema["numeric"].items() if t == "float64"}
+    try:
+        return pd.read_csv(data, sep=sep, engine="pyarrow", dtype=dtypes)
+    except Exception:
+        # Valores atípicos fuera de la muestra: lectura sin tipos, se coerciona luego
+        data.seek(0)
+        return pd.read_csv(data, sep=sep, low_memory=False)
+
+
+def _parse(file_bytes, filename):
     try:
         data = BytesIO(file_bytes)
-        if filename.endswith(".csv"):
-            try:
-                preview = pd.read_csv(data, nrows=5)
-                data.seek(0)
-                date_cols = []
-                for col in preview.columns:
-                    cl = col.lower()
-                    if cl == "t" or any(
-                        x in cl for x in ["timestamp", "date", "time", "fecha"]
-                    ):
-                        date_cols.append(col)
-                if date_cols:
-                    df = pd.read_csv(data, parse_dates=date_cols)
-                else:
-                    df = pd.read_csv(data)
-            except:
-                data.seek(0)
-                df = pd.read_csv(data)
+        if filename.endswith(".parquet"):
+            # Ya tipado (p.ej. salida de standarCSV): sin inferencia de texto
+            df = pd.read_parquet(data)
+            schema = {"dates": {}, "numeric": {}}
         elif filename.endswith((".xlsx", ".xls")):
             df = pd.read_excel(data)
+            text_cols = [
+                c
+                for c in df.columns
+                if df[c].dtype == object
+                or pd.api.types.is_string_dtype(df[c])
+                or (is_date_name(c) and pd.api.types.is_numeric_dtype(df[c]))
+            ]
+            schema = infer_schema(df[text_cols].head(200).astype("string"))
         else:
-            try:
-                df = pd.read_csv(data)
-            except:
-                data.seek(0)
-                df = pd.read_csv(data, sep=None, engine="python")
-
-        df.columns = df.columns.str.strip()
-
-        for c in df.columns:
-            is_potential_date = False
-            if df[c].dtype == object or pd.api.types.is_numeric_dtype(df[c]):
-                if c.lower() == "t" or any(
-                    x in c.lower() for x in ["timestamp", "date", "time"]
-                ):
-                    is_potential_date = True
-
-            if is_potential_date or pd.api.types.is_datetime64_any_dtype(df[c]):
-                try:
-                    df[c] = pd.to_datetime(df[c], utc=True, errors="coerce")
-                    if df[c].dt.tz is not None:
-                        df[c] = df[c].dt.tz_localize(None)
-                    continue
-                except:
-                    pass
-
-            if df[c].dtype == object:
-                sample = df[c].dropna().head(50)
-                if (
-                    not sample.empty
-                    and sample.astype(str).str.match(r"^-?\d+(\.\d+)?$").all()
-                ):
-                    df[c] = pd.to_numeric(df[c], errors="coerce")
-        return df
+            sep, sample_df = sniff_csv(data.read(SCHEMA_SAMPLE_BYTES))
+            data.seek(0)
+            schema = infer_schema(sample_df)
+            df = _read_csv(data, sep, schema)
+
+        return apply_schema(df, schema)
     except Exception as e:
         return str(e)
 
 
+def apply_schema(df, schema):
+    for c, fmt in schema["dates"].items():
+        if c in df.columns:
+            df[c] = _to_datetime(df[c], fmt)
+    for c in schema["numeric"]:
+        if c in df.columns and not pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in df.columns:
+        if c not in schema["dates"] and pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = _to_datetime(df[c], None)
+
+    df.columns = df.columns.str.strip()
+    return df
+
+
 class SpatialRole(TypedDict):
     x: Optional[str]
     y: Optional[str]
@@ -79,7 +173,27 @@ class Roles(TypedDict):
     numeric: List[str]
 
 
-def detect_roles_fast(df) -> Roles:
+ENTITY_MAX_UNIQUE = 400
+
+
+def _cached_roles(df, fingerprint):
+    meta = cache.get_meta(fingerprint) or {}
+    roles = meta.get("roles")
+    if not roles:
+        return None
+    cols = set(df.columns)
+    used = [roles["time"], roles["entity"], *roles["spatial"].values()]
+    if all(c is None or c in cols for c in used) and set(roles["numeric"]) <= cols:
+        return roles
+    return None
+
+
+def detect_roles_fast(df, fingerprint=None) -> Roles:
+    if fingerprint:
+        roles = _cached_roles(df, fingerprint)
+        if roles is not None:
+            return roles
+
     roles: Roles = {
         "time": None,
         "entity": None,
@@ -108,6 +222,12 @@ def detect_roles_fast(df) -> Roles:
             roles["numeric"].append(c)
 
     for c in df.select_dtypes(include=["object", "category"]).columns:
-        if roles["entity"] is None and df[c].nunique() < 400:
+        if approx_nunique(df[c], limit=ENTITY_MAX_UNIQUE) < ENTITY_MAX_UNIQUE:
             roles["entity"] = c
+            break
+
+    if fingerprint:
+        meta = cache.get_meta(fingerprint) or {}
+        meta["roles"] = roles
+        cache.put_meta(fingerprint, meta)
     return roles
@@ -0,0 +1,363 @@
+import ast
+import re
+from dataclasses import dataclass, field
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+try:
+    import numexpr
+except ImportError:  # backend opcional
+    numexpr = None
+
+# =============================================================================
+# VARIABLES DERIVADAS: FÓRMULAS COMPILADAS + GRAFO DE DEPENDENCIAS
+# =============================================================================
+# -----------------------------------------------------------------------------
+# OPERADORES POR GRUPO / VENTANA
+# df_master ya está ordenado por tiempo: un argsort estable por grupo deja cada
+# entidad contigua y en orden temporal, y cada operador es una sola pasada.
+# -----------------------------------------------------------------------------
+
+
+def _group_layout(n, by, layouts=None):
+    """(order, inicio del grupo para cada posición ordenada).
+
+    `layouts` es la caché de una sola evaluación (ver evaluate): p.ej. la
+    distancia acumulada hace varios diff(..., by=e) sobre la misma columna.
+    """
+    if by is None:
+        return np.arange(n), np.zeros(n, dtype=np.int64)
+    if layouts is not None and id(by) in layouts:
+        return layouts[id(by)][1]
+    codes = pd.factorize(by)[0]
+    if codes.max(initial=0) < np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16)  # argsort estable por radix
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    is_start = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    starts = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+    if layouts is not None:
+        layouts[id(by)] = (by, (order, starts))  # la referencia fija el id
+    return order, starts
+
+
+def _scatter(order, values):
+    out = np.empty(len(values), dtype=np.float64)
+    out[order] = values
+    return out
+
+
+def _shifted(v, starts, periods):
+    idx = np.arange(len(v)) - periods
+    out = np.full(len(v), np.nan)
+    ok = idx >= starts
+    out[ok] = v[idx[ok]]
+    return out
+
+
+def lag(values, periods=1, by=None, _layouts=None):
+    v = np.asarray(values, dtype=np.float64)
+    order, starts = _group_layout(len(v), by, _layouts)
+    return _scatter(order, _shifted(v[order], starts, int(periods)))
+
+
+def diff(values, periods=1, by=None, _layouts=None):
+    v = np.asarray(values, dtype=np.float64)
+    order, starts = _group_layout(len(v), by, _layouts)
+    vs = v[order]
+    return _scatter(order, vs - _shifted(vs, starts, int(periods)))
+
+
+def _group_cumsum(vs, starts):
+    cs = np.cumsum(np.nan_to_num(vs))
+    before = np.where(starts > 0, cs[starts - 1], 0.0)
+    return cs, cs - before
+
+
+def cumsum(values, by=None, _layouts=None):
+    v = np.asarray(values, dtype=np.float64)
+    order, starts = _group_layout(len(v), by, _layouts)
+    vs = v[order]
+    out = _group_cumsum(vs, starts)[1]
+    out[np.isnan(vs)] = np.nan  # como pandas: el NaN no suma pero sigue siendo NaN
+    return _scatter(order, out)
+
+
+def rolling(values, window, by=None, _layouts=None):
+    """Media móvil de las últimas `window` filas del grupo (min_periods=1)."""
+    v = np.asarray(values, dtype=np.float64)
+    order, starts = _group_layout(len(v), by, _layouts)
+    vs = v[order]
+    # Sumas acumuladas con 0 inicial: ventana = cs[i + 1] - cs[inicio_ventana]
+    cs = np.concatenate([[0.0], np.cumsum(np.nan_to_num(vs))])
+    cnt = np.concatenate([[0], np.cumsum(~np.isnan(vs))])
+    first = np.maximum(np.arange(len(vs)) - int(window) + 1, starts)
+    counts = cnt[1:] - cnt[first]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (cs[1:] - cs[first]) / counts
+    return _scatter(order, np.where(counts > 0, means, np.nan))
+
+
+FUNCTIONS = {
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp,
+    "abs": np.abs,
+    "mean": np.nanmean,
+    "rolling": rolling,
+    "diff": diff,
+    "cumsum": cumsum,
+    "lag": lag,
+}
+NUMEXPR_FUNCTIONS = {"sqrt", "log", "exp", "abs"}
+GROUPED_FUNCTIONS = {"rolling", "diff", "cumsum", "lag"}
+
+_BACKTICK = re.compile(r"`([^`]+)`")
+
+# Solo aritmética, comparaciones y llamadas a FUNCTIONS: las fórmulas guardadas
+# se vuelven a ejecutar al abrir un snapshot, así que nada de atributos,
+# subíndices, lambdas ni comprensiones.
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.BoolOp,
+    ast.IfExp,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Call,
+    ast.keyword,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+    ast.boolop,
+)
+
+
+class _Elementwise(ast.NodeTransformer):
+    """`and`/`or` piden el valor de verdad de un array entero: se reescriben a
+    `&`/`|`, que numpy y numexpr aplican elemento a elemento."""
+
+    _OPS = {ast.And: ast.BitAnd, ast.Or: ast.BitOr}
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = self._OPS[type(node.op)]
+        out = node.values[0]
+        for value in node.values[1:]:
+            out = ast.BinOp(left=out, op=op(), right=value)
+        return ast.copy_location(out, node)
+
+
+@dataclass
+class Formula:
+    name: str
+    text: str
+    kind: str  # "numeric" | "categorical"
+    code: object
+    expr: str
+    columns: dict  # identificador -> columna
+    backend: str
+    deps: set = field(default_factory=set)
+
+
+def compile_formula(name, text, kind, known):
+    """Traduce `columna` a identificadores, valida nombres y compila una vez."""
+    columns = {}
+
+    def _ident(m):
+        col = m.group(1)
+        for ident, c in columns.items():
+            if c == col:
+                return ident
+        ident = f"_c{len(columns)}"
+        columns[ident] = col
+        return ident
+
+    expr = _BACKTICK.sub(_ident, text.strip())
+    tree = ast.parse(expr, mode="eval")
+    calls = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Expresión no permitida: {type(node).__name__}")
+        if isinstance(node, ast.keyword) and (node.arg is None or node.arg[0] == "_"):
+            raise ValueError("Argumento no permitido")
+        if isinstance(node, ast.Name) and "__" in node.id:
+            raise ValueError(f"Identificador no permitido: {node.id}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise ValueError(f"Función no soportada: {ast.unparse(node.func)}")
+            calls.add(node.func.id)
+        elif isinstance(node, ast.Name) and node.id not in columns:
+            if node.id in FUNCTIONS:
+                continue
+            if node.id not in known:
+                raise ValueError(f"Variable desconocida: {node.id}")
+            columns[node.id] = node.id
+
+    tree = ast.fix_missing_locations(_Elementwise().visit(tree))
+    expr = ast.unparse(tree)
+    backend = (
+        "numexpr" if numexpr is not None and calls <= NUMEXPR_FUNCTIONS else "numpy"
+    )
+    return Formula(
+        name=name,
+        text=text,
+        kind=kind,
+        code=compile(tree, f"<{name}>", "eval"),
+        expr=expr,
+        columns=columns,
+        backend=backend,
+        deps=set(columns.values()),
+    )
+
+
+def _operand(s):
+    """Columna como operando. Enteros compactados (int32, ver core.compact) se
+    suben a int64: numpy no avisa cuando la aritmética desborda."""
+    if not (
+        pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s)
+    ):
+        return s
+    v = s.to_numpy()
+    if v.dtype.kind in "iu" and v.dtype.itemsize < 8:
+        return v.astype(np.int64)
+    return v
+
+
+def evaluate(formula, df):
+    # Columnas de texto/categoría como Series: factorize usa sus códigos directamente
+    local = {ident: _operand(df[col]) for ident, col in formula.columns.items()}
+    res = None
+    if formula.backend == "numexpr":
+        try:
+            res = numexpr.evaluate(formula.expr, local_dict=local)
+        except Exception:
+            res = None  # p.ej. columnas no numéricas: se usa numpy
+    if res is None:
+        layouts = {}  # layouts por grupo, solo durante esta evaluación
+        funcs = {
+            k: partial(f, _layouts=layouts) if k in GROUPED_FUNCTIONS else f
+            for k, f in FUNCTIONS.items()
+        }
+        res = eval(formula.code, {"__builtins__": {}, **funcs}, local)
+    if np.ndim(res) == 0:
+        res = np.full(len(df), res)
+    res = pd.Series(res, index=df.index, name=formula.name)
+    if formula.kind == "categorical":
+        return res.astype(str)
+    return pd.to_numeric(res, errors="coerce")
+
+
+class DerivedEngine:
+    """Fórmulas con nombre que sobreviven a recargas y se recalculan solo si cambia
+    algo aguas arriba (otra derivada o el dataset base)."""
+
+    def __init__(self):
+        self.formulas = {}
+        self.errors = {}
+        self._versions = {}
+        self._stamps = {}
+
+    def define(self, name, text, kind, known):
+        if name in self.formulas:
+            known = set(known) - {name}
+        formula = compile_formula(name, text, kind, set(known) | set(self.formulas))
+        if name in formula.deps:
+            raise ValueError(f"Referencia circular en '{name}'")
+        previous = self.formulas.get(name)
+        self.formulas[name] = formula
+        try:
+            self.order()
+        except ValueError:
+            if previous is None:
+                del self.formulas[name]
+            else:
+                self.formulas[name] = previous
+            raise
+        self._stamps.pop(name, None)
+        self._versions[name] = self._versions.get(name, 0) + 1
+        return formula
+
+    def remove(self, name):
+        users = [n for n, f in self.formulas.items() if name in f.deps]
+        if users:
+            raise ValueError(f"'{name}' es usada por: {', '.join(users)}")
+        self.formulas.pop(name, None)
+        self._stamps.pop(name, None)
+        self.errors.pop(name, None)
+
+    def _downstream(self, name):
+        out, frontier = set(), {name}
+        while frontier:
+            nxt = {n for n, f in self.formulas.items() if f.deps & frontier} - out
+            out |= nxt
+            frontier = nxt
+        return out
+
+    def order(self):
+        done, order = set(), []
+
+        def visit(name, path):
+            if name in done or name not in self.formulas:
+                return
+            if name in path:
+                raise ValueError(f"Referencia circular en '{name}'")
+            for dep in self.formulas[name].deps:
+                visit(dep, path | {name})
+            done.add(name)
+            order.append(name)
+
+        for name in self.formulas:
+            visit(name, frozenset())
+        return order
+
+    def _stamp(self, name, base_token):
+        f = self.formulas[name]
+        return (f.text, f.kind) + tuple(
+            (d, self._versions.get(d) if d in self.formulas else base_token)
+            for d in sorted(f.deps)
+        )
+
+    def materialize(self, df, base_token):
+        """Agrega/actualiza en df solo las derivadas obsoletas. Devuelve las recalculadas."""
+        recomputed = []
+        for name in self.order():
+            stamp = self._stamp(name, base_token)
+            if self._stamps.get(name) == stamp and name in df.columns:
+                continue
+            missing = [d for d in self.formulas[name].deps if d not in df.columns]
+            if missing:
+                self.errors[name] = f"Faltan columnas: {', '.join(missing)}"
+                continue
+            try:
+                df[name] = evaluate(self.formulas[name], df)
+            except Exception as e:
+                self.errors[name] = str(e)
+                continue
+            self.errors.pop(name, None)
+            self._stamps[name] = stamp
+            # Nueva versión: las dependientes quedan obsoletas en esta misma pasada
+            self._versions[name] = self._versions.get(name, 0) + 1
+            recomputed.append(name)
+        return recomputed
+
+    def adopt(self, df, base_token):
+        """Marca como vigentes las derivadas que ya vienen en df (p.ej. un snapshot)."""
+        for name in self.order():
+            if name in df.columns:
+                self._stamps[name] = self._stamp(name, base_token)
+
+    def sync_roles(self, roles, df):
+        for name, f in self.formulas.items():
+            if name not in df.columns:
+                continue
+            numeric = f.kind == "numeric" and pd.api.types.is_numeric_dtype(df[name])
+            if numeric and name not in roles["numeric"]:
+                roles["numeric"].append(name)
+            elif not numeric and name in roles["numeric"]:
+                roles["numeric"].remove(name)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# REDUCCIÓN VISUAL DE SERIES DE TIEMPO (LTTB / M4 MIN-MAX)
+# =============================================================================
+
+
+def _as_float(s):
+    if pd.api.types.is_datetime64_any_dtype(s):
+        v = s.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+        v[s.isna().to_numpy()] = np.nan
+        return v
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def minmax_indices(x, y, n_buckets):
+    """M4: primero, último, mínimo y máximo de cada bucket temporal.
+
+    Los buckets se definen sobre el valor de x (no por cantidad de filas), así
+    los huecos de telemetría quedan como buckets vacíos y se ven en el gráfico.
+    """
+    n = len(y)
+    if n <= 4 * n_buckets:
+        return np.arange(n)
+    edges = np.searchsorted(x, np.linspace(x[0], x[-1], n_buckets + 1)[1:-1])
+    starts = np.unique(np.concatenate([[0], edges]))
+    starts = starts[starts < n]
+    ends = np.append(starts[1:], n) - 1
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+
+    lo = np.where(np.isnan(y), np.inf, y)
+    hi = np.where(np.isnan(y), -np.inf, y)
+    mins = np.minimum.reduceat(lo, starts)
+    maxs = np.maximum.reduceat(hi, starts)
+    # Primera posición donde cada bucket alcanza su mínimo / máximo
+    _, imin = np.unique(bucket[lo == mins[bucket]], return_index=True)
+    _, imax = np.unique(bucket[hi == maxs[bucket]], return_index=True)
+    pmin = np.flatnonzero(lo == mins[bucket])[imin]
+    pmax = np.flatnonzero(hi == maxs[bucket])[imax]
+    return np.unique(np.concatenate([starts, ends, pmin, pmax]))
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets. El bucle es por bucket, no por punto."""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_positions(df, x, y, entity=None, n_points=2000, method="lttb"):
+    """Posiciones (iloc) a dibujar. Reduce cada entidad por separado.
+
+    df debe venir ordenado por x (el índice de filtrado ya lo garantiza).
+    """
+    xv = _as_float(df[x])
+    yv = _as_float(df[y])
+    valid = ~(np.isnan(xv) | np.isnan(yv))
+
+    if entity and entity in df.columns:
+        codes = pd.factorize(df[entity])[0]
+    else:
+        codes = np.zeros(len(df), dtype=np.int64)
+    codes = np.where(valid, codes, -1)
+
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0]) if valid.any() else np.array([], dtype=np.int64)
+    bounds = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+
+    parts = []
+    for k in range(len(counts)):
+        pos = order[bounds[k] : bounds[k + 1]]
+        if not len(pos):
+            continue
+        if method == "lttb":
+            sel = lttb_indices(xv[pos], yv[pos], n_points)
+        else:
+            sel = minmax_indices(xv[pos], yv[pos], max(n_points // 4, 1))
+        parts.append(pos[sel])
+    if not parts:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(parts))
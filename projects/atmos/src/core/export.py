@@ -0,0 +1,148 @@
+import atexit
+import gzip
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# =============================================================================
+# EXPORTACIÓN PEREZOSA POR BLOQUES (CSV / CSV.GZ / PARQUET / FEATHER)
+# =============================================================================
+EXPORT_CHUNK_ROWS = 250_000
+EXPORT_CACHE_MAX_BYTES = 512 * 1024**2
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Feather": ("feather", "application/vnd.apache.arrow.file"),
+}
+
+
+def frame_chunks(df, rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, max(len(df), 1), rows):
+        yield df.iloc[start : start + rows]
+
+
+def _write_csv(chunks, out):
+    header = True
+    for chunk in chunks:
+        out.write(chunk.to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+
+
+def _write_arrow(chunks, out, fmt):
+    writer, schema = None, None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            if fmt == "Parquet":
+                writer = pq.ParquetWriter(out, schema, compression="zstd")
+            else:
+                options = ipc.IpcWriteOptions(compression="zstd")
+                writer = ipc.new_file(out, schema, options=options)
+        else:
+            table = table.cast(schema, safe=False)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+
+
+def write_export(chunks, fmt):
+    """Serializa un iterable de DataFrames a un temporal en disco; devuelve la ruta.
+
+    Nada se arma en memoria: cada bloque se escribe directo al archivo.
+    """
+    fd, path = tempfile.mkstemp(
+        prefix="atmos-export-", suffix=f".{EXPORT_FORMATS[fmt][0]}"
+    )
+    try:
+        with open(fd, "wb") as out:
+            if fmt == "CSV":
+                _write_csv(chunks, out)
+            elif fmt == "CSV (gzip)":
+                with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=5) as gz:
+                    _write_csv(chunks, gz)
+            else:
+                _write_arrow(chunks, out, fmt)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class ExportCache:
+    """LRU de exportaciones (archivos temporales) por huella de filtro, acotado
+    en bytes de disco.
+
+    Vive a nivel de proceso: los callables de st.download_button corren en
+    otro hilo, sin acceso a st.session_state.
+    """
+
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # clave -> (ruta, bytes)
+        self._lock = threading.Lock()
+
+    def open_or_build(self, key, build):
+        """Archivo abierto para leer; se abre antes de soltar el lock, así una
+        eviction concurrente (unlink) no lo corta a mitad de la descarga."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return open(self._items[key][0], "rb")
+        path = build()
+        f = open(path, "rb")
+        size = os.fstat(f.fileno()).st_size
+        with self._lock:
+            if key in self._items:  # otra descarga la construyó a la vez
+                self._unlink(self._items.pop(key)[0])
+            self._items[key] = (path, size)
+            total = sum(n for _, n in self._items.values())
+            # También sale la recién agregada si por sí sola supera el límite
+            while total > self.max_bytes:
+                _, (old, n) = self._items.popitem(last=False)
+                self._unlink(old)
+                total -= n
+        return f
+
+    def clear(self):
+        with self._lock:
+            while self._items:
+                self._unlink(self._items.popitem()[1][0])
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+EXPORTS = ExportCache()
+atexit.register(EXPORTS.clear)
+
+
+def lazy_export(key, chunks_fn, fmt, wrap=None):
+    """Callable para st.download_button: serializa solo al hacer clic.
+
+    wrap(nombre, build) -> build permite medir la serialización (perfil).
+    """
+
+    def build():
+        return write_export(chunks_fn(), fmt)
+
+    if wrap is not None:
+        build = wrap(f"export {fmt}", build)
+
+    def read():
+        # st.download_button no cierra el archivo: se lee aquí y se devuelven bytes
+        with EXPORTS.open_or_build((key, fmt), build) as f:
+            return f.read()
+
+    return read
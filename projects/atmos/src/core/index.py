@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# ÍNDICE DE FILTRADO: ORDEN TEMPORAL + PARTICIONES POR ENTIDAD
+# =============================================================================
+
+
+def sort_by_time(df, roles):
+    """Ordena por tiempo (NaT al final). Conserva el índice original como id de fila."""
+    t = roles["time"]
+    if not t:
+        return df
+    order = np.argsort(df[t].to_numpy(), kind="stable")
+    if (order == np.arange(len(order))).all():
+        return df
+    return df.take(order)
+
+
+class FilterIndex:
+    """Requiere un DataFrame ya ordenado con sort_by_time.
+
+    Guarda posiciones (no el DataFrame): sigue siendo válido mientras no cambie
+    el orden de filas, p.ej. al agregar columnas derivadas.
+    """
+
+    def __init__(self, df, roles):
+        self.n = len(df)
+        self.time_col = roles["time"]
+        self.entity_col = roles["entity"]
+        self.times = None
+        self.n_valid = self.n
+        if self.time_col:
+            self.times = df[self.time_col].to_numpy(dtype="datetime64[ns]")
+            self.n_valid = int(self.n - np.isnat(self.times).sum())
+
+        self.entities = []
+        self.partitions = {}
+        if self.entity_col:
+            codes, uniques = pd.factorize(df[self.entity_col].astype(str), sort=True)
+            order = np.argsort(codes, kind="stable")  # estable: conserva orden temporal
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0]))])
+            offset = int((codes < 0).sum())
+            self.entities = list(uniques)
+            for k, name in enumerate(self.entities):
+                self.partitions[name] = order[offset + bounds[k] : offset + bounds[k + 1]]
+
+    def time_bounds(self):
+        if self.times is None or self.n_valid == 0:
+            return None, None
+        return pd.Timestamp(self.times[0]), pd.Timestamp(self.times[self.n_valid - 1])
+
+    def positions(self, entities=None, trange=None):
+        """Devuelve (lo, hi, pos): pos es None si el filtro es un tramo contiguo."""
+        lo, hi = 0, self.n
+        if trange is not None and self.times is not None:
+            valid = self.times[: self.n_valid]
+            lo = int(np.searchsorted(valid, np.datetime64(trange[0], "ns"), "left"))
+            hi = int(np.searchsorted(valid, np.datetime64(trange[1], "ns"), "right"))
+
+        if entities is None or len(entities) >= len(self.entities):
+            return lo, hi, None
+
+        parts = []
+        for name in entities:
+            p = self.partitions.get(name)
+            if p is None:
+                continue
+            a, b = np.searchsorted(p, [lo, hi])
+            parts.append(p[a:b])
+        pos = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        pos.sort()
+        return lo, hi, pos
+
+    def select(self, df, entities=None, trange=None):
+        lo, hi, pos = self.positions(entities, trange)
+        if pos is None:
+            return df.iloc[lo:hi]  # vista, sin copia
+        return df.take(pos)
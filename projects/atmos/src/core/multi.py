@@ -0,0 +1,174 @@
+import hashlib
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from core import cache
+from core.data import _parse
+
+# =============================================================================
+# INGESTA DE VARIOS ARCHIVOS (UN CSV POR TURNO / DÍA) EN PARALELO
+# =============================================================================
+INGEST_SUFFIXES = (".csv", ".xlsx", ".xls", ".parquet")
+# Bajo este total no compensa levantar procesos (importar pandas en cada uno)
+PARALLEL_MIN_BYTES = 32 * 1024**2
+MAX_WORKERS = int(os.environ.get("ATMOS_INGEST_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def list_sources(directory):
+    """Archivos ingeribles de un directorio, en orden de nombre.
+
+    Los Parquet se buscan también en subdirectorios: un dataset particionado
+    (date=aaaa-mm-dd/part-*.parquet) es un archivo por partición.
+    """
+    directory = Path(directory)
+    found = [
+        p
+        for p in directory.iterdir()
+        if p.is_file() and p.suffix.lower() in INGEST_SUFFIXES
+    ]
+    found += [p for p in directory.glob("*/**/*.parquet") if p.is_file()]
+    return sorted(found)
+
+
+def combined_fingerprint(fps, dedupe):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"multi|{int(bool(dedupe))}|".encode())
+    for fp in sorted(fps):
+        h.update(fp.encode())
+    return h.hexdigest()
+
+
+def _parse_source(source):
+    """Trabajo de cada proceso: source es (nombre, bytes) o una ruta."""
+    if isinstance(source, tuple):
+        name, payload = source
+    else:
+        name, payload = Path(source).name, Path(source).read_bytes()
+    return _parse(payload, name)
+
+
+def _pool(workers):
+    """Procesos con forkserver (spawn donde no existe); nunca fork.
+
+    Hacer fork del proceso de Streamlit copiaría sus hilos y locks a medio
+    tomar. Los hijos solo necesitan _parse_source, importable desde core.multi:
+    el servidor de forkserver lo precarga (pandas/Arrow incluidos) y cada hijo
+    se bifurca de ahí. Atmos.py se importa en los hijos como __mp_main__, por
+    eso la app corre bajo `if __name__ == "__main__"`.
+    """
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload(["core.multi"])
+    else:
+        ctx = mp.get_context("spawn")
+    return ProcessPoolExecutor(workers, mp_context=ctx)
+
+
+def parse_many(sources, fps, workers=MAX_WORKERS):
+    """Un DataFrame por fuente (cache en disco primero, el resto en paralelo)."""
+    frames = [cache.get(fp) for fp in fps]
+    pending = [i for i, df in enumerate(frames) if df is None]
+    total = sum(_size(sources[i]) for i in pending)
+
+    if len(pending) > 1 and workers > 1 and total >= PARALLEL_MIN_BYTES:
+        with _pool(min(workers, len(pending))) as pool:
+            parsed = list(pool.map(_parse_source, [sources[i] for i in pending]))
+    else:
+        parsed = [_parse_source(sources[i]) for i in pending]
+
+    for i, df in zip(pending, parsed):
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError(f"{_name(sources[i])}: {df}")
+        cache.put(fps[i], df)
+        frames[i] = df
+    return frames
+
+
+def _size(source):
+    return len(source[1]) if isinstance(source, tuple) else Path(source).stat().st_size
+
+
+def _name(source):
+    return source[0] if isinstance(source, tuple) else Path(source).name
+
+
+# -----------------------------------------------------------------------------
+# RECONCILIACIÓN DE ESQUEMAS
+# -----------------------------------------------------------------------------
+def _is_text(s):
+    return (
+        s.dtype == object
+        or pd.api.types.is_string_dtype(s)
+        or isinstance(s.dtype, pd.CategoricalDtype)
+    )
+
+
+def _target_kind(series_list):
+    kinds = set()
+    for s in series_list:
+        if pd.api.types.is_datetime64_any_dtype(s):
+            kinds.add("datetime")
+        elif pd.api.types.is_numeric_dtype(s):
+            kinds.add("numeric")  # incluye bool
+        elif s.isna().all():
+            continue  # columna vacía en ese archivo: no vota
+        else:
+            kinds.add("text")
+    if len(kinds) <= 1:
+        return kinds.pop() if kinds else None
+    if kinds == {"text", "numeric"} or kinds == {"text", "datetime"}:
+        # Texto mezclado: si todo el texto convierte sin pérdida se conserva el tipo
+        other = (kinds - {"text"}).pop()
+        convert = pd.to_datetime if other == "datetime" else pd.to_numeric
+        if all(
+            convert(s.dropna(), errors="coerce").notna().all()
+            for s in series_list
+            if _is_text(s)
+        ):
+            return other
+    return "text"
+
+
+def _cast(s, kind):
+    if kind == "numeric" and _is_text(s):
+        return pd.to_numeric(s, errors="coerce")
+    if kind == "datetime" and not pd.api.types.is_datetime64_any_dtype(s):
+        return pd.to_datetime(s, errors="coerce")
+    if kind == "text" and (not _is_text(s) or isinstance(s.dtype, pd.CategoricalDtype)):
+        return s.astype(str).where(s.notna())
+    return s
+
+
+def reconcile(frames):
+    """Unión de columnas con un tipo común por columna (orden de aparición)."""
+    columns = list(dict.fromkeys(c for df in frames for c in df.columns))
+    kinds = {
+        c: _target_kind([df[c] for df in frames if c in df.columns]) for c in columns
+    }
+    out = []
+    for df in frames:
+        df = df.copy(deep=False)
+        for c in df.columns:
+            df[c] = _cast(df[c], kinds[c])
+        out.append(df)
+    return columns, out
+
+
+def concat_frames(frames):
+    if len(frames) == 1:
+        return frames[0]
+    columns, frames = reconcile(frames)
+    return pd.concat(frames, ignore_index=True, sort=False).reindex(columns=columns)
+
+
+def dedupe_entity_time(df, roles):
+    """Quita filas repetidas en (entidad, tiempo); gana la última (archivo más nuevo)."""
+    keys = [c for c in (roles["entity"], roles["time"]) if c]
+    if len(keys) < 2:
+        return df, 0
+    dup = df.duplicated(keys, keep="last")
+    n = int(dup.sum())
+    return (df[~dup].reset_index(drop=True) if n else df), n
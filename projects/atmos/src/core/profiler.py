@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from core import cache
+
+# =============================================================================
+# PERFIL POR EJECUCIÓN (TIEMPO + MEMORIA POR ETAPA, LOG JSONL)
+# =============================================================================
+PROFILE_ENABLED = os.environ.get("ATMOS_PROFILE", "") not in ("", "0")
+PROFILE_LOG = Path(
+    os.environ.get("ATMOS_PROFILE_LOG", cache.CACHE_DIR / "profile.jsonl")
+)
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_log_lock = threading.Lock()
+
+
+def rss_mb():
+    """RSS actual del proceso (Linux). None si no está disponible."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE / 1024**2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def append_log(records, path=PROFILE_LOG):
+    if not records:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = "".join(json.dumps(r, default=str) + "\n" for r in records)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+    except OSError:
+        pass  # el perfil nunca debe romper la app
+
+
+class Profiler:
+    """Etapas (anidables) de una ejecución del script de Streamlit."""
+
+    def __init__(self, session, run):
+        self.session = session
+        self.run = run
+        self.records = []
+        self._depth = 0
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        m0 = rss_mb()
+        t0 = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            m1 = rss_mb()
+            self.records.append(
+                {
+                    "stage": name,
+                    "depth": self._depth,
+                    "start_ms": round((t0 - self._t0) * 1000, 2),
+                    "ms": round((time.perf_counter() - t0) * 1000, 2),
+                    "rss_mb": None if m1 is None else round(m1, 1),
+                    "delta_mb": None if m0 is None or m1 is None else round(m1 - m0, 1),
+                }
+            )
+
+    def flush(self, path=PROFILE_LOG):
+        stamp = time.time()
+        append_log(
+            [
+                {"ts": stamp, "session": self.session, "run": self.run, **r}
+                for r in self.records
+            ],
+            path,
+        )
+
+
+def logged(name, fn, session=None):
+    """Envuelve fn para registrar su duración directo en el log.
+
+    Para trabajo fuera de la ejecución del script (p.ej. callables de
+    st.download_button, que corren en otro hilo).
+    """
+
+    def run():
+        m0 = rss_mb()
+        t0 = time.perf_counter()
+        out = fn()
+        m1 = rss_mb()
+        append_log(
+            [
+                {
+                    "ts": time.time(),
+                    "session": session,
+                    "run": None,
+                    "stage": name,
+                    "depth": 0,
+                    "ms": round((time.perf_counter() - t0) * 1000, 2),
+                    "rss_mb": None if m1 is None else round(m1, 1),
+                    "delta_mb": None if m0 is None or m1 is None else round(m1 - m0, 1),
+                }
+            ]
+        )
+        return out
+
+    return run
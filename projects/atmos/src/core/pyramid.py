@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# PIRÁMIDE TEMPORAL MULTI-RESOLUCIÓN (MEDIA / MÍN / MÁX / CONTEO POR ENTIDAD)
+# =============================================================================
+# Cada nivel agrega el anterior (los anchos son múltiplos): armar 1h no vuelve
+# a leer las filas crudas. Las columnas se agregan la primera vez que se piden.
+LEVELS = {
+    "1s": 1_000_000_000,
+    "1min": 60_000_000_000,
+    "15min": 900_000_000_000,
+    "1h": 3_600_000_000_000,
+}
+
+
+class TimePyramid:
+    """Requiere df ordenado por tiempo y su FilterIndex."""
+
+    def __init__(self, df, index):
+        self.df = df
+        self.time_col = index.time_col
+        self.entity_col = index.entity_col
+        if index.entity_col:
+            self.entities = list(index.entities)
+            parts = [
+                index.partitions[e][index.partitions[e] < index.n_valid]
+                for e in self.entities
+            ]
+        else:
+            self.entities = [None]
+            parts = [np.arange(index.n_valid)]
+        sizes = [len(p) for p in parts]
+        # Entidades contiguas y, dentro de cada una, en orden temporal
+        self.rows = (
+            np.concatenate(parts).astype(np.int64)
+            if parts
+            else np.empty(0, dtype=np.int64)
+        )
+        self.slot = np.repeat(np.arange(len(parts)), sizes)
+        self.t = index.times[self.rows].astype(np.int64)
+        self._layouts = {}
+        self._columns = {}
+
+    # -------------------------------------------------------------------------
+    # CONSTRUCCIÓN
+    # -------------------------------------------------------------------------
+    def _layout(self, level):
+        """(inicios en el nivel previo, inicio de bucket, entidad, offsets)."""
+        if level in self._layouts:
+            return self._layouts[level]
+        names = list(LEVELS)
+        k = names.index(level)
+        if k == 0:
+            t, slot = self.t, self.slot
+        else:
+            _, t, slot, _ = self._layout(names[k - 1])
+        bucket = t // LEVELS[level]
+        new = np.ones(len(bucket), dtype=bool)
+        new[1:] = (bucket[1:] != bucket[:-1]) | (slot[1:] != slot[:-1])
+        starts = np.flatnonzero(new)
+        b_slot = slot[starts]
+        offsets = np.searchsorted(b_slot, np.arange(len(self.entities) + 1))
+        layout = (starts, bucket[starts] * LEVELS[level], b_slot, offsets)
+        self._layouts[level] = layout
+        return layout
+
+    def _aggregate(self, col, level):
+        key = (col, level)
+        if key in self._columns:
+            return self._columns[key]
+        names = list(LEVELS)
+        k = names.index(level)
+        starts = self._layout(level)[0]
+        if len(starts) == 0:
+            empty = np.empty(0)
+            agg = {"n": empty, "sum": empty, "min": empty, "max": empty}
+        elif k == 0:
+            v = self.df[col].to_numpy(dtype=np.float64, na_value=np.nan)[self.rows]
+            valid = ~np.isnan(v)
+            agg = {
+                "n": np.add.reduceat(valid.astype(np.int64), starts),
+                "sum": np.add.reduceat(np.where(valid, v, 0.0), starts),
+                "min": np.fmin.reduceat(v, starts),
+                "max": np.fmax.reduceat(v, starts),
+            }
+        else:
+            prev = self._aggregate(col, names[k - 1])
+            agg = {
+                "n": np.add.reduceat(prev["n"], starts),
+                "sum": np.add.reduceat(prev["sum"], starts),
+                "min": np.fmin.reduceat(prev["min"], starts),
+                "max": np.fmax.reduceat(prev["max"], starts),
+            }
+        self._columns[key] = agg
+        return agg
+
+    # -------------------------------------------------------------------------
+    # CONSULTA
+    # -------------------------------------------------------------------------
+    def _ranges(self, level, entities=None, trange=None):
+        """[a, b) de buckets por entidad pedida, recortados al rango temporal."""
+        _, b_t, _, offsets = self._layout(level)
+        wanted = (
+            range(len(self.entities))
+            if entities is None or self.entity_col is None
+            else [self.entities.index(e) for e in entities if e in self.entities]
+        )
+        if trange is not None:
+            t0, t1 = (np.datetime64(v, "ns").astype(np.int64) for v in trange)
+            t0 -= t0 % LEVELS[level]  # incluye el bucket que contiene a t0
+        ranges = []
+        for s in wanted:
+            a, b = int(offsets[s]), int(offsets[s + 1])
+            if trange is not None:
+                seg = b_t[a:b]
+                a, b = (
+                    a + int(np.searchsorted(seg, t0, "left")),
+                    a + int(np.searchsorted(seg, t1, "right")),
+                )
+            ranges.append((a, b))
+        return ranges
+
+    def n_buckets(self, level, entities=None, trange=None):
+        """Buckets del nivel dentro de las entidades y el rango pedidos."""
+        return sum(b - a for a, b in self._ranges(level, entities, trange))
+
+    def choose_level(
+        self,
+        span_ns,
+        target_points,
+        raw_rows,
+        n_entities=1,
+        max_points=None,
+        entities=None,
+        trange=None,
+    ):
+        """Nivel más grueso que aún llena el gráfico; None = filas crudas.
+
+        Si ese nivel excede max_points (sumando entidades) se usa el siguiente
+        más grueso, aunque no llene el ancho. raw_rows son las filas ya
+        filtradas: se comparan con los buckets del mismo filtro.
+        """
+        coarser = None
+        for level in reversed(LEVELS):
+            per_entity = span_ns / LEVELS[level]
+            if per_entity >= target_points:
+                if max_points and coarser and per_entity * n_entities > max_points:
+                    return coarser
+                # Un nivel que no reduce filas (p.ej. 1s sobre datos a 1 Hz) no sirve
+                n = self.n_buckets(level, entities, trange)
+                return level if n < raw_rows else None
+            coarser = level
+        return None
+
+    def frame(self, col, level, entities=None, trange=None):
+        """Buckets de col en el nivel, filtrados por entidades y rango temporal."""
+        b_t = self._layout(level)[1]
+        agg = self._aggregate(col, level)
+        parts = [np.arange(a, b) for a, b in self._ranges(level, entities, trange)]
+        pos = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        n = agg["n"][pos]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = agg["sum"][pos] / n
+        out = {self.time_col: pd.to_datetime(b_t[pos])}
+        if self.entity_col:
+            names = np.array(self.entities, dtype=object)
+            out[self.entity_col] = names[self._layout(level)[2][pos]]
+        out[col] = mean
+        out[f"{col} mín"] = agg["min"][pos]
+        out[f"{col} máx"] = agg["max"][pos]
+        out["n"] = n
+        return pd.DataFrame(out)
@@ -0,0 +1,122 @@
+import copy
+import os
+import threading
+import time
+import weakref
+
+# =============================================================================
+# REGISTRO COMPARTIDO DE DATASETS (UNA COPIA POR HUELLA Y PROCESO)
+# =============================================================================
+# Cada sesión recibe una copia superficial del DataFrame base: sus derivadas y
+# compactaciones crean columnas propias (copy-on-write, activado en Atmos.py
+# para pandas 2.x) sin tocar la base.
+# La referencia de una sesión es un Lease guardado en su session_state; cuando
+# Streamlit descarta la sesión el Lease se recolecta y el conteo baja solo.
+REGISTRY_MAX_BYTES = int(os.environ.get("ATMOS_REGISTRY_MAX_MB", "2048")) * 1024**2
+
+
+class SharedDataset:
+    def __init__(self, fp, df, roles, index, trajectories=None):
+        self.fp = fp
+        self.df = df
+        self.roles = roles
+        self.index = index
+        self.trajectories = trajectories
+        self.nbytes = int(df.memory_usage(deep=True).sum())
+        self.leases = weakref.WeakSet()
+        self.last_used = time.monotonic()
+
+
+class Lease:
+    """Referencia de una sesión a un dataset compartido."""
+
+    def __init__(self, entry, registry=None):
+        self.entry = entry
+        self.registry = registry
+        entry.leases.add(self)
+
+    @property
+    def fp(self):
+        return self.entry.fp
+
+    @property
+    def index(self):
+        return self.entry.index
+
+    @property
+    def trajectories(self):
+        return self.entry.trajectories
+
+    def frame(self):
+        return self.entry.df.copy(deep=False)
+
+    def roles(self):
+        # detect_roles entrega listas mutables (sync_roles las modifica)
+        return copy.deepcopy(self.entry.roles)
+
+    def release(self):
+        if self.registry is not None:
+            self.registry.release(self)
+        else:
+            self.entry.leases.discard(self)
+
+
+class DatasetRegistry:
+    def __init__(self, max_bytes=REGISTRY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = {}
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, fp, build):
+        """Lease sobre `fp`; si no existe, build() -> (df, roles, index, trayectorias).
+
+        Dos sesiones que piden la misma huella a la vez esperan un único build.
+        """
+        with self._lock:
+            key_lock = self._building.setdefault(fp, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(fp)
+            if entry is None:
+                entry = SharedDataset(fp, *build())
+                with self._lock:
+                    self._entries[fp] = entry
+                    self._building.pop(fp, None)
+        entry.last_used = time.monotonic()
+        lease = Lease(entry, self)
+        # Después del lease: el recién construido no es candidato a salir
+        with self._lock:
+            self._evict()
+        return lease
+
+    def release(self, lease):
+        """Suelta el lease; si el dataset quedó libre puede salir por LRU."""
+        with self._lock:
+            lease.entry.leases.discard(lease)
+            lease.entry.last_used = time.monotonic()
+            self._evict()
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        idle = sorted(
+            (e for e in self._entries.values() if not e.leases),
+            key=lambda e: e.last_used,
+        )
+        for e in idle:
+            if total <= self.max_bytes:
+                break
+            del self._entries[e.fp]
+            total -= e.nbytes
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "Huella": e.fp[:10],
+                    "Filas": len(e.df),
+                    "MB": e.nbytes / 1024**2,
+                    "Sesiones": len(e.leases),
+                }
+                for e in self._entries.values()
+            ]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from core.downsample import _as_float
+
+# =============================================================================
+# SELECCIÓN A RESOLUCIÓN COMPLETA (BOX / LASSO -> PUNTO EN POLÍGONO)
+# =============================================================================
+# El gráfico solo dibuja una muestra; la geometría de la selección se aplica
+# sobre los datos filtrados completos y devuelve posiciones de filas reales.
+
+
+def _coords(values, is_datetime):
+    if is_datetime:
+        # Plotly entrega fechas como texto "YYYY-MM-DD HH:MM:SS.fff"
+        v = pd.to_datetime(pd.Series(values), errors="coerce")
+        return v.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def selection_polygons(selection, x_is_datetime=False, y_is_datetime=False):
+    """Polígonos (xs, ys) de las cajas y lazos de una selección de st.plotly_chart."""
+    polygons = []
+    for box in selection.get("box", []):
+        x0, x1 = _coords(box.get("x", []), x_is_datetime)[:2]
+        y0, y1 = _coords(box.get("y", []), y_is_datetime)[:2]
+        polygons.append((np.array([x0, x1, x1, x0]), np.array([y0, y0, y1, y1])))
+    for lasso in selection.get("lasso", []):
+        xs = _coords(lasso.get("x", []), x_is_datetime)
+        ys = _coords(lasso.get("y", []), y_is_datetime)
+        if len(xs) >= 3:
+            polygons.append((xs, ys))
+    return [
+        p
+        for p in polygons
+        if len(p[0]) and np.isfinite(p[0]).all() and np.isfinite(p[1]).all()
+    ]
+
+
+def polygons_bbox(polygons):
+    xs = np.concatenate([p[0] for p in polygons])
+    ys = np.concatenate([p[1] for p in polygons])
+    return xs.min(), xs.max(), ys.min(), ys.max()
+
+
+def points_in_polygon(x, y, xs, ys):
+    """Regla par-impar vectorizada: el bucle es por arista, no por punto."""
+    inside = np.zeros(len(x), dtype=bool)
+    xj, yj = xs[-1], ys[-1]
+    for xi, yi in zip(xs, ys):
+        crosses = (yi > y) != (yj > y)
+        if crosses.any():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                xcross = (xj - xi) * (y - yi) / (yj - yi) + xi
+            inside ^= crosses & (x < xcross)
+        xj, yj = xi, yi
+    return inside
+
+
+def select_positions(x, y, polygons, candidates=None):
+    """Posiciones (ordenadas) de los puntos dentro de la unión de polígonos.
+
+    candidates: posiciones ya acotadas por un índice (grilla, búsqueda temporal).
+    """
+    if candidates is None:
+        candidates = np.arange(len(x))
+    cx, cy = x[candidates], y[candidates]
+    hit = np.zeros(len(candidates), dtype=bool)
+    for xs, ys in polygons:
+        # Descarte por bounding box antes de la prueba exacta
+        box = (cx >= xs.min()) & (cx <= xs.max()) & (cy >= ys.min()) & (cy <= ys.max())
+        box &= ~hit
+        if len(xs) == 4 and len(set(xs)) == 2 and len(set(ys)) == 2:
+            hit |= box  # caja: el bounding box ya es exacto (bordes incluidos)
+            continue
+        idx = np.flatnonzero(box)
+        hit[idx] = points_in_polygon(cx[idx], cy[idx], xs, ys)
+    return np.sort(candidates[hit])
+
+
+def frame_selection(df, x, y, polygons, sorted_x=False):
+    """Posiciones iloc de df dentro de la selección.
+
+    Con sorted_x (eje X = tiempo en un df ordenado) el rango en X de la
+    selección se resuelve con búsqueda binaria.
+    """
+    xv, yv = _as_float(df[x]), _as_float(df[y])
+    candidates = None
+    if sorted_x:
+        x0, x1, _, _ = polygons_bbox(polygons)
+        valid = int(np.searchsorted(np.isnan(xv), True))  # NaT quedan al final
+        lo = np.searchsorted(xv[:valid], x0, side="left")
+        hi = np.searchsorted(xv[:valid], x1, side="right")
+        candidates = np.arange(lo, hi)
+    return select_positions(xv, yv, polygons, candidates)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# HYPERLOGLOG (CARDINALIDAD APROXIMADA, VECTORIZADO)
+# =============================================================================
+
+
+class HyperLogLog:
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return self
+        h = pd.util.hash_array(values.to_numpy(dtype=object))
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest_bits = 64 - self.p
+        w = h & np.uint64((1 << rest_bits) - 1)
+        # rank = posición del primer 1 en los bits restantes (1-indexado)
+        nz = w > 0
+        rank = np.full(len(w), rest_bits + 1, dtype=np.uint8)
+        rank[nz] = rest_bits - np.floor(np.log2(w[nz].astype(np.float64))).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        est = self._alpha * self.m**2 / np.sum(2.0 ** -self.registers.astype(np.float64))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * self.m and zeros:
+            est = self.m * np.log(self.m / zeros)  # linear counting
+        return int(round(est))
+
+
+def approx_nunique(s, limit=None, budget=1_000_000, block=65_536):
+    """Cardinalidad aproximada con muestreo acotado y salida temprana al superar limit."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return len(s.cat.categories)
+    n = len(s)
+    if n > budget:
+        # Bloques contiguos repartidos a lo largo de la serie
+        starts = np.linspace(0, n - block, max(budget // block, 1)).astype(np.int64)
+    else:
+        starts = np.arange(0, n, block)
+    hll = HyperLogLog()
+    for start in starts:
+        hll.update(s.iloc[start : start + block])
+        if limit is not None and hll.count() >= limit:
+            break
+    return hll.count()
@@ -0,0 +1,91 @@
+import json
+import os
+import re
+import time
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from core import cache
+
+# =============================================================================
+# SNAPSHOTS DE WORKSPACE (ARROW IPC + ROLES + FÓRMULAS)
+# =============================================================================
+# El .arrow se escribe sin compresión: así al reabrirlo con memory_map las
+# columnas numéricas apuntan directo a las páginas del archivo (sin parseo ni
+# copia) y el sistema operativo carga solo lo que se lee.
+SNAPSHOT_DIR = cache.CACHE_DIR / "snapshots"
+SNAPSHOT_VERSION = 1
+
+_SAFE_NAME = re.compile(r"[^\w\-. ]+")
+
+
+def snapshot_name(text):
+    return _SAFE_NAME.sub("_", text).strip(" .") or "workspace"
+
+
+def _paths(name):
+    # Los nombres llegan también de ?ws=: nada que cambie al sanear (../, /)
+    if snapshot_name(name) != name:
+        raise ValueError(f"Nombre de snapshot inválido: {name!r}")
+    return SNAPSHOT_DIR / f"{name}.arrow", SNAPSHOT_DIR / f"{name}.json"
+
+
+def list_snapshots():
+    """Nombres guardados, del más reciente al más antiguo."""
+    if not SNAPSHOT_DIR.exists():
+        return []
+    metas = sorted(
+        SNAPSHOT_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True
+    )
+    return [p.stem for p in metas if p.with_suffix(".arrow").exists()]
+
+
+def save_snapshot(name, df, roles, engine, source=None, fingerprint=None):
+    """Guarda df (con derivadas) + roles + fórmulas. Devuelve el nombre usado."""
+    name = snapshot_name(name)
+    data_path, meta_path = _paths(name)
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # El índice son los ids de fila originales: se conserva como columna
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    tmp = data_path.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=1_000_000)
+    os.replace(tmp, data_path)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "created": time.time(),
+        "source": source,
+        "fingerprint": fingerprint,
+        "rows": len(df),
+        "roles": roles,
+        "formulas": [
+            {"name": f.name, "text": f.text, "kind": f.kind}
+            for f in (engine.formulas[n] for n in engine.order())
+        ],
+    }
+    tmp = meta_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(meta, default=str), encoding="utf-8")
+    os.replace(tmp, meta_path)
+    return name
+
+
+def load_snapshot(name):
+    """(df, meta). Las columnas quedan respaldadas por el archivo mapeado."""
+    data_path, meta_path = _paths(name)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot '{name}' de una versión incompatible")
+    # Sin context manager: los buffers de Arrow mantienen vivo el mapeo
+    source = pa.memory_map(str(data_path), "r")
+    table = ipc.open_file(source).read_all()
+    # split_blocks evita consolidar columnas en bloques 2D (que obliga a copiar)
+    df = table.to_pandas(split_blocks=True)
+    return df, meta
+
+
+def delete_snapshot(name):
+    for p in _paths(name):
+        p.unlink(missing_ok=True)
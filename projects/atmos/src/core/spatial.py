@@ -0,0 +1,109 @@
+import numpy as np
+
+# =============================================================================
+# ÍNDICE ESPACIAL EN GRILLA (NIVEL DE DETALLE POR VIEWPORT)
+# =============================================================================
+
+
+class GridIndex:
+    """Grilla uniforme cells x cells sobre el bounding box de (x, y).
+
+    Las posiciones se guardan ordenadas por celda: una fila de celdas del
+    viewport es un tramo contiguo de `order`.
+    """
+
+    def __init__(self, x, y, cells=256):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.cells = cells
+        valid = np.isfinite(self.x) & np.isfinite(self.y)
+        if not valid.any():
+            self.bounds = None
+            self.order = np.empty(0, dtype=np.int64)
+            self.starts = np.zeros(cells * cells + 1, dtype=np.int64)
+            return
+        xv, yv = self.x[valid], self.y[valid]
+        self.bounds = (xv.min(), xv.max(), yv.min(), yv.max())
+
+        cell = np.full(len(self.x), cells * cells, dtype=np.int64)
+        cell[valid] = self._cell_of(xv, yv)
+        self.order = np.argsort(cell, kind="stable")[: int(valid.sum())]
+        self.starts = np.searchsorted(cell[self.order], np.arange(cells * cells + 1))
+
+    def _axis_cell(self, v, lo, hi):
+        span = (hi - lo) or 1.0
+        return np.clip(((v - lo) / span * self.cells).astype(np.int64), 0, self.cells - 1)
+
+    def _cell_of(self, x, y):
+        x0, x1, y0, y1 = self.bounds
+        return self._axis_cell(y, y0, y1) * self.cells + self._axis_cell(x, x0, x1)
+
+    def candidates(self, bbox=None, keep=None):
+        """Todas las posiciones dentro de bbox (x0, x1, y0, y1), sin límite."""
+        if self.bounds is None:
+            return np.empty(0, dtype=np.int64)
+        x0, x1, y0, y1 = bbox or self.bounds
+        bx0, bx1, by0, by1 = self.bounds
+        cx0, cx1 = self._axis_cell(np.array([x0, x1]), bx0, bx1)
+        cy0, cy1 = self._axis_cell(np.array([y0, y1]), by0, by1)
+
+        rows = [
+            self.order[self.starts[cy * self.cells + cx0] : self.starts[cy * self.cells + cx1 + 1]]
+            for cy in range(cy0, cy1 + 1)
+        ]
+        pos = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        px, py = self.x[pos], self.y[pos]
+        inside = (px >= x0) & (px <= x1) & (py >= y0) & (py <= y1)
+        if keep is not None:
+            inside &= keep(pos)
+        return pos[inside]
+
+    def query(self, viewport=None, keep=None, budget=50000):
+        """Posiciones dentro del viewport (x0, x1, y0, y1), a lo sumo ~budget.
+
+        keep(pos) -> máscara booleana para aplicar filtros externos.
+        Si hay más puntos que budget, se limita la cantidad por celda: las
+        zonas densas se aligeran y las dispersas conservan todos sus puntos.
+        """
+        pos = self.candidates(viewport, keep)
+
+        if len(pos) > budget:
+            cell = self._cell_of(self.x[pos], self.y[pos])
+            # pos ya viene agrupado por celda: rango dentro de cada celda
+            first = np.r_[0, np.flatnonzero(np.diff(cell)) + 1]
+            counts = np.diff(np.r_[first, len(pos)])
+            rank = np.arange(len(pos)) - np.repeat(first, counts)
+            cnt = np.repeat(counts, counts)
+            take = np.minimum(cnt, _cap_for_budget(counts, budget))
+            # Selección equiespaciada dentro de la celda (no solo los primeros)
+            pos = pos[(rank + 1) * take // cnt > rank * take // cnt]
+            if len(pos) > budget:
+                # Más celdas ocupadas que presupuesto: una de cada n celdas
+                pos = pos[np.linspace(0, len(pos) - 1, budget).astype(np.int64)]
+        return np.sort(pos)
+
+
+def _cap_for_budget(counts, budget):
+    """Mayor k tal que sum(min(counts, k)) <= budget (búsqueda binaria)."""
+    lo, hi = 1, int(counts.max())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(counts, mid).sum() <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def keep_filter(lo, hi, pos):
+    """Convierte la salida de FilterIndex.positions en un predicado para query."""
+    if pos is None:
+        return lambda p: (p >= lo) & (p < hi)
+
+    def keep(p):
+        i = np.searchsorted(pos, p)
+        ok = i < len(pos)
+        ok[ok] = pos[i[ok]] == p[ok]
+        return ok
+
+    return keep
@@ -0,0 +1,225 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from core import cache
+from core.data import (
+    ENTITY_MAX_UNIQUE,
+    SCHEMA_SAMPLE_BYTES,
+    apply_schema,
+    detect_roles_fast,
+    infer_schema,
+    sniff_csv,
+)
+from core.stats import merge_summaries, metrics_from_summaries, summarize
+
+# =============================================================================
+# INGESTA OUT-OF-CORE: CSV POR BLOQUES -> DATASET PARQUET EN DISCO
+# =============================================================================
+STORE_DIR = cache.STORE_DIR
+DEFAULT_BUDGET_MB = int(os.environ.get("ATMOS_MEMORY_BUDGET_MB", "512"))
+
+
+def _widen(schema, other):
+    """Tipo común por columna: float64 entre numéricos, si no texto."""
+    fields = []
+    for f in schema:
+        t = other.field(f.name).type if f.name in other.names else f.type
+        if t == f.type or pa.types.is_null(t):
+            fields.append(f)
+        elif pa.types.is_null(f.type):
+            fields.append(f.with_type(t))
+        elif all(
+            pa.types.is_integer(x) or pa.types.is_floating(x) for x in (t, f.type)
+        ):
+            fields.append(f.with_type(pa.float64()))
+        else:
+            fields.append(f.with_type(pa.string()))
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def _recast_parts(directory, schema):
+    for part in sorted(directory.glob("part-*.parquet")):
+        table = pq.read_table(part).cast(schema, safe=False)
+        tmp = part.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, part)
+
+
+class ChunkedStore:
+    def __init__(self, path):
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.roles = self.meta["roles"]
+        self.columns = self.meta["columns"]
+        self.rows = self.meta["rows"]
+        parts = sorted(str(p) for p in path.glob("part-*.parquet"))
+        self.dataset = ds.dataset(parts, format="parquet")
+
+    # -------------------------------------------------------------------------
+    # INGESTA
+    # -------------------------------------------------------------------------
+    @classmethod
+    def open_or_ingest(cls, file_obj, fp, budget_mb=DEFAULT_BUDGET_MB):
+        path = STORE_DIR / fp
+        if (path / "meta.json").exists():
+            # LRU: el mtime de meta.json marca el último acceso (cache._evict)
+            (path / "meta.json").touch()
+            return cls(path)
+
+        head = file_obj.read(SCHEMA_SAMPLE_BYTES)
+        file_obj.seek(0)
+        sep, sample_df = sniff_csv(head)
+        schema = infer_schema(sample_df)
+        # En modo out-of-core todos los numéricos son float64 (nulos entre bloques)
+        numeric = [c.strip() for c in schema["numeric"]]
+
+        sample = apply_schema(sample_df.copy(), schema)
+        row_bytes = max(sample.memory_usage(deep=True).sum() / max(len(sample), 1), 1)
+        # Margen x4: parseo + conversión + tabla Arrow conviven en memoria
+        chunksize = max(int(budget_mb * 1024**2 / (row_bytes * 4)), 10_000)
+
+        tmp = path.with_suffix(".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        arrow_schema = None
+        roles = None
+        rows = 0
+        tmin = tmax = None
+        uniques = {}
+        for i, chunk in enumerate(
+            pd.read_csv(file_obj, sep=sep, chunksize=chunksize, low_memory=False)
+        ):
+            chunk = apply_schema(chunk, schema)
+            for c in numeric:
+                chunk[c] = pd.to_numeric(chunk[c], errors="coerce").astype("float64")
+            if roles is None:
+                roles = detect_roles_fast(chunk)
+                uniques = {
+                    c: set()
+                    for c in chunk.select_dtypes(include=["object", "category"]).columns
+                }
+
+            t = roles["time"]
+            if t:
+                cmin, cmax = chunk[t].min(), chunk[t].max()
+                if pd.notnull(cmin):
+                    tmin = cmin if tmin is None else min(tmin, cmin)
+                    tmax = cmax if tmax is None else max(tmax, cmax)
+            for c in list(uniques):
+                uniques[c].update(chunk[c].dropna().astype(str).unique())
+                if len(uniques[c]) >= ENTITY_MAX_UNIQUE:
+                    del uniques[c]
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if arrow_schema is None:
+                arrow_schema = table.schema
+            elif table.schema != arrow_schema:
+                try:
+                    table = table.cast(arrow_schema, safe=False)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    # El esquema sale del primer bloque: si uno posterior no
+                    # encaja (p.ej. texto en una columna entera) se ensancha y
+                    # se reescriben las partes ya escritas
+                    arrow_schema = _widen(arrow_schema, table.schema)
+                    _recast_parts(tmp, arrow_schema)
+                    table = table.cast(arrow_schema, safe=False)
+            pq.write_table(table, tmp / f"part-{i:05d}.parquet")
+            rows += len(chunk)
+
+        roles = roles or detect_roles_fast(sample)
+        roles["entity"] = next(iter(uniques), None)
+        meta = {
+            "roles": roles,
+            "columns": [f.name for f in arrow_schema] if arrow_schema else [],
+            "rows": rows,
+            "time_range": [str(tmin), str(tmax)] if tmin is not None else None,
+            "entities": sorted(uniques[roles["entity"]]) if roles["entity"] else [],
+            "chunksize": chunksize,
+            "row_bytes": float(row_bytes),
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        cache._evict(keep=path)
+        return cls(path)
+
+    # -------------------------------------------------------------------------
+    # CONSULTAS
+    # -------------------------------------------------------------------------
+    def time_range(self):
+        tr = self.meta["time_range"]
+        return (pd.Timestamp(tr[0]), pd.Timestamp(tr[1])) if tr else (None, None)
+
+    def entities(self):
+        return self.meta["entities"]
+
+    def window_rows(self, budget_mb=DEFAULT_BUDGET_MB):
+        """Filas que caben en memoria (mitad del presupuesto) para la ventana visual."""
+        return max(int(budget_mb * 1024**2 / (self.meta["row_bytes"] * 2)), 10_000)
+
+    def _expr(self, filters):
+        expr = None
+        filters = filters or {}
+        ents = filters.get("entities")
+        if ents is not None and self.roles["entity"]:
+            expr = ds.field(self.roles["entity"]).isin(list(ents))
+        trange = filters.get("trange")
+        if trange and self.roles["time"]:
+            f = ds.field(self.roles["time"])
+            e = (f >= pd.Timestamp(trange[0])) & (f <= pd.Timestamp(trange[1]))
+            expr = e if expr is None else expr & e
+        return expr
+
+    def count(self, filters=None):
+        return self.dataset.count_rows(filter=self._expr(filters))
+
+    def batches(self, filters=None, columns=None):
+        scanner = self.dataset.scanner(columns=columns, filter=self._expr(filters))
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def query(self, filters=None, columns=None, max_rows=None):
+        """Materializa el filtro; si excede max_rows devuelve un muestreo con paso fijo."""
+        total = self.count(filters)
+        stride = 1 if not max_rows or total <= max_rows else -(-total // max_rows)
+        parts, offset = [], 0
+        for part in self.batches(filters, columns):
+            if stride > 1:
+                idx = np.arange((-offset) % stride, len(part), stride)
+                offset += len(part)
+                part = part.iloc[idx]
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=columns or self.columns)
+        out = pd.concat(parts, ignore_index=True)
+        t = self.roles["time"]
+        if t and t in out.columns:
+            # Las partes van en orden de archivo; LTTB/M4 y el índice asumen x creciente
+            out = out.sort_values(t, kind="stable", ignore_index=True)
+        return out
+
+    def metrics(self, name, cols, filters=None):
+        """Telemetría equivalente a generate_metrics, fusionada lote a lote."""
+        cols = [c for c in dict.fromkeys(cols) if c and c in self.columns]
+        if not cols:
+            return {"Scope": name, "Count": self.count(filters), "Channels": {}}
+        kinds, parts = {}, {c: [] for c in cols}
+        count = 0
+        for part in self.batches(filters, cols):
+            count += len(part)
+            for c in cols:
+                kinds[c], summary = summarize(part[c])
+                parts[c].append(summary)
+        return metrics_from_summaries(
+            name,
+            count,
+            {c: (kinds.get(c, "Numeric"), merge_summaries(parts[c])) for c in cols},
+        )
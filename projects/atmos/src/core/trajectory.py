@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# TRAYECTORIAS POR ENTIDAD (TIEMPO ORDENADO, DISTANCIA ACUMULADA, DETENCIONES)
+# =============================================================================
+# Cada entidad ocupa un tramo contiguo [offsets[k], offsets[k + 1]) de los
+# arreglos, ordenado por tiempo: "equipo X entre 10:00 y 10:15" son dos
+# búsquedas binarias dentro de su tramo.
+DWELL_SPEED = float(os.environ.get("ATMOS_DWELL_SPEED", "0.5"))  # unidades/s
+DWELL_MIN_S = float(os.environ.get("ATMOS_DWELL_MIN_S", "120"))
+
+_NS = 1e9
+
+
+class TrajectoryStore:
+    """Se arma desde el FilterIndex (particiones ya en orden temporal)."""
+
+    def __init__(self, df, roles, index, dwell_speed=DWELL_SPEED, dwell_min_s=None):
+        dwell_min_s = DWELL_MIN_S if dwell_min_s is None else dwell_min_s
+        self.entities = list(index.entities)
+        self._slot = {name: k for k, name in enumerate(self.entities)}
+        # Sin tiempo válido no hay trayectoria: las filas NaT quedan fuera
+        parts = [
+            index.partitions[name][index.partitions[name] < index.n_valid]
+            for name in self.entities
+        ]
+        sizes = [len(p) for p in parts]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self.rows = (
+            np.concatenate(parts).astype(np.int64)
+            if parts
+            else np.empty(0, dtype=np.int64)
+        )
+        self.t = index.times[self.rows].astype(np.int64)
+
+        axes = [c for c in roles["spatial"].values() if c and c in df.columns]
+        coords = [
+            pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)[self.rows]
+            for c in axes
+        ]
+        first = np.zeros(len(self.rows), dtype=bool)
+        first[self.offsets[:-1][np.array(sizes) > 0]] = True
+
+        step = np.zeros(len(self.rows))
+        if coords and len(self.rows) > 1:
+            d2 = sum(np.diff(v, prepend=v[:1]) ** 2 for v in coords)
+            step = np.nan_to_num(np.sqrt(d2))
+        step[first] = 0.0
+        self.step = step
+        self.cumdist = np.cumsum(step)
+
+        dt = np.diff(self.t, prepend=self.t[:1]) / _NS
+        dt[first] = 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.step_speed = np.where(dt > 0, step / dt, 0.0)
+        self.dwells = self._dwells(first, dwell_speed, dwell_min_s)
+
+    def _dwells(self, first, speed, min_s):
+        """Tramos donde la velocidad entre puntos se mantiene bajo `speed`."""
+        slow = self.step_speed < speed
+        slow[first] = False  # una detención no cruza de una entidad a otra
+        edges = np.diff(np.r_[0, slow.astype(np.int8), 0])
+        starts = np.flatnonzero(edges == 1) - 1  # el punto previo abre la detención
+        ends = np.flatnonzero(edges == -1) - 1
+        dur = (self.t[ends] - self.t[starts]) / _NS
+        keep = dur >= min_s
+        starts, ends, dur = starts[keep], ends[keep], dur[keep]
+        slot = np.searchsorted(self.offsets, starts, side="right") - 1
+        return pd.DataFrame(
+            {
+                "Entidad": np.array(self.entities, dtype=object)[slot]
+                if len(slot)
+                else np.empty(0, dtype=object),
+                "Inicio": pd.to_datetime(self.t[starts]),
+                "Fin": pd.to_datetime(self.t[ends]),
+                "Duración (s)": dur,
+                "start": starts,
+                "end": ends,
+            }
+        )
+
+    def span(self, entity, trange=None):
+        """Tramo [a, b) de los arreglos para entity dentro de trange (O(log n))."""
+        k = self._slot.get(entity)
+        if k is None:
+            return 0, 0
+        a, b = int(self.offsets[k]), int(self.offsets[k + 1])
+        if trange is not None:
+            t0, t1 = (np.datetime64(v, "ns").astype(np.int64) for v in trange)
+            seg = self.t[a:b]
+            a, b = (
+                a + int(np.searchsorted(seg, t0, "left")),
+                a + int(np.searchsorted(seg, t1, "right")),
+            )
+        return a, b
+
+    def window(self, entity, trange=None):
+        """Posiciones en df_master de entity dentro de trange, en orden temporal."""
+        a, b = self.span(entity, trange)
+        return self.rows[a:b]
+
+    def distance(self, entity, trange=None):
+        a, b = self.span(entity, trange)
+        if b - a < 2:
+            return 0.0
+        return float(self.cumdist[b - 1] - self.cumdist[a])
+
+    def dwells_in(self, entities=None, trange=None):
+        d = self.dwells
+        if entities is not None:
+            d = d[d["Entidad"].isin(entities)]
+        if trange is not None:
+            d = d[(d["Fin"] >= trange[0]) & (d["Inicio"] <= trange[1])]
+        return d.drop(columns=["start", "end"])
+
+    def summary(self, entities=None, trange=None):
+        """Puntos, distancia y tiempo detenido por entidad dentro del filtro."""
+        dwells = self.dwells_in(entities, trange)
+        stopped = dwells.groupby("Entidad")["Duración (s)"].agg(["sum", "count"])
+        rows = []
+        for name in self.entities if entities is None else entities:
+            a, b = self.span(name, trange)
+            rows.append(
+                {
+                    "Entidad": name,
+                    "Puntos": b - a,
+                    "Distancia": self.distance(name, trange),
+                    "Detenido (min)": stopped["sum"].get(name, 0.0) / 60,
+                    "Detenciones": int(stopped["count"].get(name, 0)),
+                }
+            )
+        return pd.DataFrame(rows)
+
+
+def build_trajectories(df, roles, index):
+    """TrajectoryStore si hay entidad, tiempo y al menos X/Y; si no, None."""
+    sp = roles["spatial"]
+    if not (roles["entity"] and roles["time"] and sp["x"] and sp["y"]):
+        return None
+    return TrajectoryStore(df, roles, index)
@@ -1,47 +1,359 @@
 import argparse
 import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import shutil
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
-def procesar_csv(input_file, output_file):
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # sin watchdog el seguimiento usa sondeo
+    Observer = None
+
+FIELDNAMES = ["timestamp", "temp", "relative_humidity"]
+FIELDS_ENTRADA = ("date", "hour", "temp", "relative_humidity")
+FORMATO_ENTRADA = "%d/%m/%Y %H:%M:%S"
+FORMATO_SALIDA = "%Y-%m-%d %H:%M:%S"
+CHUNK_ROWS = 500_000
+# "dd/mm/aaaa HH:MM:SS" con ceros: el caso habitual, se resuelve sobre los bytes
+PATRON_FIJO = r"^\d\d/\d\d/\d{4} \d\d:\d\d:\d\d$"
+ANCHO_FIJO = 19
+# Bytes de salida (aaaa-mm-dd HH:MM:SS) tomados de la entrada; 2 y 5 son "/"
+PERMUTACION = [6, 7, 8, 9, 2, 3, 4, 5, 0, 1, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+# Lo que csv.writer encerraría entre comillas
+REQUIERE_COMILLAS = np.frombuffer(b',"\r\n', dtype=np.uint8)
+
+
+# =============================================================================
+# MOTOR VECTORIZADO (POR BLOQUES)
+# =============================================================================
+def _fila_lenta(texto):
+    """Ruta fila a fila: el mismo strptime/strftime (y el mismo error) de siempre."""
+    return datetime.strptime(texto, FORMATO_ENTRADA).strftime(FORMATO_SALIDA)
+
+
+def _bytes(arr):
+    """Bytes concatenados de los valores de un arreglo Arrow de texto."""
+    if len(arr) == 0:
+        return np.empty(0, dtype=np.uint8)
+    offsets = np.frombuffer(arr.buffers()[1], np.int32, len(arr) + 1, arr.offset * 4)
+    return np.frombuffer(arr.buffers()[2], np.uint8)[offsets[0] : offsets[-1]]
+
+
+def _fijos(texto):
+    """(timestamps, válidos) de textos de ancho fijo, sin pasar por datetime."""
+    b = _bytes(texto).reshape(-1, ANCHO_FIJO)
+    d = b.astype(np.int32) - ord("0")
+    dia, mes, anio = (
+        d[:, 0] * 10 + d[:, 1],
+        d[:, 3] * 10 + d[:, 4],
+        (d[:, 6] * 1000 + d[:, 7] * 100 + d[:, 8] * 10 + d[:, 9]),
+    )
+    h, m, s = (d[:, k] * 10 + d[:, k + 1] for k in (11, 14, 17))
+    meses = ((anio - 1970) * 12 + np.clip(mes, 1, 12) - 1).astype("datetime64[M]")
+    largo = (
+        (meses + np.timedelta64(1, "M")).astype("datetime64[D]")
+        - meses.astype("datetime64[D]")
+    ).astype(np.int64)
+    # Años < 1000 van a la ruta lenta: strftime no les antepone ceros
+    validos = (
+        (anio >= 1000)
+        & (mes >= 1)
+        & (mes <= 12)
+        & (dia >= 1)
+        & (dia <= largo)
+        & (h <= 23)
+        & (m <= 59)
+        & (s <= 59)
+    )
+    out = np.ascontiguousarray(b[:, PERMUTACION])
+    out[:, [4, 7]] = ord("-")
+    n = len(out)
+    offsets = np.arange(0, ANCHO_FIJO * (n + 1), ANCHO_FIJO, dtype=np.int32)
+    ts = pa.Array.from_buffers(
+        pa.string(), n, [None, pa.py_buffer(offsets), pa.py_buffer(out)]
+    )
+    return ts, validos
+
+
+def _timestamps(fecha, hora):
+    """(timestamps ISO con nulos en las filas con error, errores por posición).
+
+    Tres rutas: ancho fijo con ceros (sobre los bytes, lo habitual); el resto
+    con el parser de formato exacto de pandas; y fila a fila con strptime lo
+    que ambas rechazan o strptime no aceptaría (segundos 60/61, años de menos
+    de 4 cifras), para reproducir el valor o el mensaje original.
+    """
+    texto = pc.binary_join_element_wise(fecha, hora, " ")
+    n = len(texto)
+    lenta = np.zeros(n, dtype=bool)
+
+    fijo = pc.match_substring_regex(texto, PATRON_FIJO).to_numpy(zero_copy_only=False)
+    out, validos = _fijos(pc.filter(texto, fijo))
+    lenta[np.flatnonzero(fijo)[~validos]] = True
+    if not fijo.all():
+        out = pc.replace_with_mask(pa.nulls(n, texto.type), fijo, out)
+
+        otros = np.flatnonzero(~fijo)
+        resto = pd.Series(pc.take(texto, otros).to_pylist())
+        dt = pd.to_datetime(resto, format=FORMATO_ENTRADA, errors="coerce")
+        lenta_resto = (
+            dt.isna() | resto.str.endswith((":60", ":61")) | (dt.dt.year < 1000)
+        ).to_numpy()
+        lenta[otros] = lenta_resto
+        mascara = np.zeros(n, dtype=bool)
+        mascara[otros[~lenta_resto]] = True
+        out = pc.replace_with_mask(
+            out,
+            mascara,
+            pa.array(dt[~lenta_resto].dt.strftime(FORMATO_SALIDA), texto.type),
+        )
+
+    errores = {}
+    if lenta.any():
+        pos = np.flatnonzero(lenta)
+        valores = []
+        for i, t in zip(pos, pc.take(texto, pos).to_pylist()):
+            try:
+                valores.append(_fila_lenta(t))
+            except ValueError as e:
+                valores.append(None)
+                errores[int(i)] = e
+        out = pc.replace_with_mask(out, lenta, pa.array(valores, out.type))
+    return out, errores
+
+
+# =============================================================================
+# ENTRADA COMPRIMIDA / SALIDA CSV O PARQUET
+# =============================================================================
+# Se detecta por los primeros bytes, no por la extensión
+FIRMAS = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd", b"BZh": "bz2"}
+SUFIJOS_COMPRESION = (".gz", ".zst", ".bz2")
+FORMATOS = ("csv", "parquet")
+SCHEMA_PARQUET = pa.schema(
+    [
+        ("timestamp", pa.timestamp("s")),
+        ("temp", pa.float64()),
+        ("relative_humidity", pa.float64()),
+    ]
+)
+
+
+def compresion(path):
+    with open(path, "rb") as f:
+        firma = f.read(4)
+    return next((c for m, c in FIRMAS.items() if firma.startswith(m)), None)
+
+
+def abrir_entrada(path):
+    """Archivo binario; gzip/zstd/bz2 se descomprimen al vuelo (sin temporales)."""
+    codec = compresion(path)
+    if codec is None:
+        return open(path, "rb")
+    return pa.input_stream(str(path), compression=codec)
+
+
+class SalidaCSV:
+    """CSV con el mismo entrecomillado y fin de línea que csv.DictWriter."""
+
+    def __init__(self, f, encabezado=True):
+        self.f = f
+        if encabezado:
+            self.f.write((",".join(FIELDNAMES) + "\r\n").encode("utf-8"))
+
+    def escribir(self, tabla):
+        # El timestamp nunca lleva comillas; solo se revisan los valores copiados
+        if any(
+            np.isin(_bytes(tabla[c].combine_chunks()), REQUIERE_COMILLAS).any()
+            for c in FIELDNAMES[1:]
+        ):
+            buf = io.StringIO()
+            csv.writer(buf).writerows(zip(*(tabla[c].to_pylist() for c in FIELDNAMES)))
+            self.f.write(buf.getvalue().encode("utf-8"))
+        else:
+            pa_csv.write_csv(
+                tabla,
+                self.f,
+                pa_csv.WriteOptions(
+                    include_header=False, eol="\r\n", quoting_style="none"
+                ),
+            )
+
+    def close(self):
+        self.f.close()
+
+
+def _float(arr):
+    """Texto decimal -> float64; lo no numérico queda nulo."""
+    try:
+        return pc.cast(arr, pa.float64())
+    except pa.ArrowInvalid:
+        serie = pd.to_numeric(arr.to_pandas(), errors="coerce")
+        return pa.array(serie, pa.float64(), from_pandas=True)
+
+
+class SalidaParquet:
+    """Dataset Parquet particionado por día (date=aaaa-mm-dd/part-NNNNN.parquet).
+
+    Un archivo por bloque y día: no quedan escritores abiertos por partición.
+    Cada parte se escribe a un temporal y se renombra (nunca queda a medias).
+    """
+
+    def __init__(self, path, limpiar=True, prefijo="part"):
+        self.root = Path(path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if limpiar:
+            # Reescritura completa, como el CSV: solo se borran partes propias
+            for part in self.root.glob("date=*/part-*.parquet"):
+                part.unlink()
+        self.prefijo = prefijo
+        self.bloque = 0
+
+    def escribir(self, tabla):
+        tabla = pa.table(
+            [
+                pc.strptime(tabla["timestamp"], FORMATO_SALIDA, "s"),
+                _float(tabla["temp"].combine_chunks()),
+                _float(tabla["relative_humidity"].combine_chunks()),
+            ],
+            schema=SCHEMA_PARQUET,
+        )
+        dias = pc.cast(tabla["timestamp"], pa.date32()).to_numpy().astype(np.int64)
+        orden = np.argsort(dias, kind="stable")
+        dias = dias[orden]
+        tabla = tabla.take(orden)
+        cortes = np.flatnonzero(np.diff(dias)) + 1
+        for a, b in zip(np.r_[0, cortes], np.r_[cortes, len(dias)]):
+            dia = np.datetime64(int(dias[a]), "D")
+            carpeta = self.root / f"date={dia}"
+            carpeta.mkdir(exist_ok=True)
+            destino = carpeta / f"{self.prefijo}-{self.bloque:05d}.parquet"
+            tmp = destino.with_name(f".{destino.name}.tmp")
+            pq.write_table(tabla.slice(a, b - a), tmp)
+            os.replace(tmp, destino)
+        self.bloque += 1
+
+    def close(self):
+        for carpeta in self.root.glob("date=*"):
+            if carpeta.is_dir() and not any(carpeta.iterdir()):
+                carpeta.rmdir()
+
+
+def _texto(serie):
+    """Columna de pandas como arreglo Arrow de texto (offsets de 32 bits)."""
+    arr = pa.array(serie)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    return arr.cast(pa.string())
+
+
+def _columna_faltante(columna):
+    print(f"Error: Columna faltante en el CSV de entrada: {KeyError(columna)}")
+    sys.exit(1)
+
+
+def _procesar_bloques(infile, salida, chunk_rows=CHUNK_ROWS, count=0):
+    """Limpia infile (binario) hacia salida; devuelve el total de registros.
+
+    count son los registros ya escritos antes (modo seguimiento): la
+    numeración de las filas con error continúa como si fuera un solo archivo.
+    """
+    vistas = []
+
+    def _usar(columna):
+        # La primera columna se lee siempre: sin ninguna esperada (p.ej. un CSV
+        # con ';') el bloque igual tiene filas y se informa la faltante
+        if not vistas:
+            vistas.append(columna)
+        return columna == vistas[0] or columna in FIELDS_ENTRADA
+
+    try:
+        # Solo texto: la salida conserva los valores tal cual (salvo la coma)
+        chunks = pd.read_csv(
+            infile,
+            encoding="utf-8",
+            dtype=str,
+            na_filter=False,
+            index_col=False,
+            usecols=_usar,
+            chunksize=chunk_rows,
+        )
+    except pd.errors.EmptyDataError:
+        chunks = []
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        # Unir date y hour y convertir a timestamp ISO
+        for columna in ("date", "hour"):
+            if columna not in chunk:
+                _columna_faltante(columna)
+        timestamps, errores = _timestamps(_texto(chunk["date"]), _texto(chunk["hour"]))
+        ok = timestamps.is_valid()
+
+        faltante = next(
+            (c for c in ("temp", "relative_humidity") if c not in chunk), None
+        )
+        if faltante:
+            # Como antes: se informan las filas inválidas hasta la primera válida
+            primera = next((i for i in range(len(chunk)) if i not in errores), None)
+            for i in sorted(errores):
+                if primera is not None and i > primera:
+                    break
+                print(f"Error procesando fila {count + 1}: {errores[i]}")
+            if primera is not None:
+                _columna_faltante(faltante)
+            continue
+
+        # Número de fila como en el bucle original: registros ya escritos + 1
+        for k, i in enumerate(sorted(errores)):
+            print(f"Error procesando fila {count + i - k + 1}: {errores[i]}")
+
+        # Convertir valores decimales con coma a punto
+        tabla = pa.table(
+            {
+                "timestamp": timestamps,
+                "temp": pc.replace_substring(_texto(chunk["temp"]), ",", "."),
+                "relative_humidity": pc.replace_substring(
+                    _texto(chunk["relative_humidity"]), ",", "."
+                ),
+            }
+        )
+        if errores:
+            tabla = tabla.filter(ok)
+        salida.escribir(tabla)
+        count += len(tabla)
+    return count
+
+
+def procesar_csv(input_file, output_file, chunk_rows=CHUNK_ROWS, formato="csv"):
     print(f"Procesando: {input_file} -> {output_file}")
     try:
         with (
-            open(input_file, "r", encoding="utf-8") as infile,
-            open(output_file, "w", newline="", encoding="utf-8") as outfile,
+            abrir_entrada(input_file) as infile,
+            closing(
+                SalidaParquet(output_file)
+                if formato == "parquet"
+                else SalidaCSV(open(output_file, "wb"))
+            ) as salida,
         ):
-            reader = csv.DictReader(infile)
-            fieldnames = ["timestamp", "temp", "relative_humidity"]
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-
-            count = 0
-            for row in reader:
-                # Unir date y hour y convertir a timestamp ISO
-                # Manejar formatos flexibles si es necesario
-                try:
-                    fecha = row["date"]
-                    hora = row["hour"]
-                    dt = datetime.strptime(f"{fecha} {hora}", "%d/%m/%Y %H:%M:%S")
-                    timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-
-                    # Convertir valores decimales con coma a punto
-                    temp = row["temp"].replace(",", ".")
-                    rh = row["relative_humidity"].replace(",", ".")
-
-                    writer.writerow(
-                        {"timestamp": timestamp, "temp": temp, "relative_humidity": rh}
-                    )
-                    count += 1
-                except ValueError as e:
-                    print(f"Error procesando fila {count + 1}: {e}")
-                    continue
-                except KeyError as e:
-                    print(f"Error: Columna faltante en el CSV de entrada: {e}")
-                    sys.exit(1)
-
+            count = _procesar_bloques(infile, salida, chunk_rows)
             print(f"Completado. {count} registros procesados.")
 
     except FileNotFoundError:
@@ -52,25 +364,448 @@ def procesar_csv(input_file, output_file):
         sys.exit(1)
 
 
+# =============================================================================
+# MODO LOTE (DIRECTORIO / GLOB) CON MANIFIESTO INCREMENTAL
+# =============================================================================
+# Se incrementa cuando cambia la salida del motor: fuerza reprocesar todo.
+MANIFEST_VERSION = 1
+MANIFEST_NAME = ".standarCSV_manifest.json"
+SUFIJO_SALIDA = "_clean"
+_HASH_BLOCK = 1024**2
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK):
+            h.update(block)
+    return h.hexdigest()
+
+
+def es_lote(patron):
+    return Path(patron).is_dir() or any(c in patron for c in "*?[")
+
+
+def _sin_compresion(name):
+    for sufijo in SUFIJOS_COMPRESION:
+        name = name.removesuffix(sufijo)
+    return name
+
+
+def nombre_base(path):
+    """'estacion.csv.gz' -> 'estacion'."""
+    return _sin_compresion(Path(path).name).removesuffix(".csv")
+
+
+def resolver_entradas(patron):
+    """Directorio (sus CSV, comprimidos o no) o glob; nunca las salidas *_clean."""
+    path = Path(patron)
+    if path.is_dir():
+        candidatos = (
+            p for p in path.iterdir() if _sin_compresion(p.name).endswith(".csv")
+        )
+    else:
+        candidatos = (Path(p) for p in glob.glob(patron, recursive=True))
+    return sorted(
+        p
+        for p in candidatos
+        if p.is_file() and not nombre_base(p).endswith(SUFIJO_SALIDA)
+    )
+
+
+def salida_para(input_path, output_dir=None, formato="csv"):
+    # Generar nombre de salida automático: archivo_clean.csv (o .parquet)
+    name = f"{nombre_base(input_path)}{SUFIJO_SALIDA}.{formato}"
+    return Path(output_dir or Path(input_path).parent) / name
+
+
+def cargar_manifiesto(path):
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def _guardar_json(path, data):
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def guardar_manifiesto(path, files):
+    _guardar_json(path, {"version": MANIFEST_VERSION, "files": files})
+
+
+def sin_cambios(input_path, output_path, entrada):
+    """Tamaño+mtime iguales basta; si difieren, decide el hash (p.ej. un touch)."""
+    if not entrada or not output_path.exists():
+        return False
+    if entrada.get("output") != str(output_path):
+        return False
+    st = input_path.stat()
+    if st.st_size != entrada["size"]:
+        return False
+    if st.st_mtime_ns == entrada["mtime_ns"]:
+        return True
+    return file_hash(input_path) == entrada["hash"]
+
+
+def _procesar_uno(input_path, output_path, formato):
+    """Trabajo de cada proceso: entrada del manifiesto o None si falló."""
+    st = input_path.stat()
+    digest = file_hash(input_path)
+    try:
+        procesar_csv(input_path, output_path, formato=formato)
+    except SystemExit:
+        return None  # procesar_csv ya informó el error
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "hash": digest,
+        "output": str(output_path),
+    }
+
+
+def procesar_lote(
+    inputs, output_dir=None, manifest=None, workers=None, force=False, formato="csv"
+):
+    """Procesa en paralelo lo que cambió desde la última corrida.
+
+    Devuelve (procesados, omitidos, fallidos).
+    """
+    if not inputs:
+        print("No se encontraron archivos CSV de entrada.")
+        return 0, 0, 0
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    manifest = Path(manifest or Path(output_dir or inputs[0].parent) / MANIFEST_NAME)
+    files = {} if force else cargar_manifiesto(manifest)
+
+    pendientes = []
+    omitidos = conflictos = 0
+    destinos = {}
+    for input_path in inputs:
+        output_path = salida_para(input_path, output_dir, formato)
+        key = str(input_path.resolve())
+        if output_path in destinos:
+            # p.ej. estacion.csv y estacion.csv.gz en el mismo directorio
+            print(
+                f"Error: {input_path} escribiría en {output_path}, "
+                f"igual que {destinos[output_path]}; se omite."
+            )
+            conflictos += 1
+            continue
+        destinos[output_path] = input_path
+        if sin_cambios(input_path, output_path, files.get(key)):
+            omitidos += 1
+        else:
+            pendientes.append((key, input_path, output_path))
+    print(f"{len(pendientes)} archivo(s) por procesar, {omitidos} sin cambios.")
+
+    fallidos = conflictos
+    try:
+        with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+            futures = {
+                pool.submit(_procesar_uno, inp, out, formato): key
+                for key, inp, out in pendientes
+            }
+            for future in as_completed(futures):
+                entrada = future.result()
+                if entrada is None:
+                    fallidos += 1
+                    files.pop(futures[future], None)
+                else:
+                    files[futures[future]] = entrada
+    finally:
+        # Lo ya procesado queda registrado aunque la corrida se interrumpa
+        guardar_manifiesto(manifest, files)
+
+    procesados = len(pendientes) - (fallidos - conflictos)
+    print(
+        f"Lote completado: {procesados} procesado(s), {omitidos} omitido(s), "
+        f"{fallidos} con error."
+    )
+    return procesados, omitidos, fallidos
+
+
+# =============================================================================
+# MODO SEGUIMIENTO (LOGGERS QUE AGREGAN AL MISMO CSV DURANTE EL DÍA)
+# =============================================================================
+SUFIJO_ESTADO = ".state.json"
+INTERVALO_S = 5.0
+_TAIL_BLOCK = 64 * 1024
+
+
+def ruta_estado(output_file):
+    return Path(f"{output_file}{SUFIJO_ESTADO}")
+
+
+def _fin_lineas_completas(f, inicio, size):
+    """Posición tras el último registro completo en [inicio, size); inicio si no hay.
+
+    inicio siempre cae en un límite de registro, así que la paridad de comillas
+    desde ahí dice si un salto de línea está dentro de un campo entre comillas
+    ("" escapado suma dos y no la cambia).
+    """
+    f.seek(inicio)
+    fin = inicio
+    pos = inicio
+    abiertas = 0
+    while pos < size:
+        bloque = np.frombuffer(f.read(min(_TAIL_BLOCK, size - pos)), dtype=np.uint8)
+        if not len(bloque):
+            break
+        paridad = (np.cumsum(bloque == ord('"')) + abiertas) % 2
+        saltos = np.flatnonzero((bloque == ord("\n")) & (paridad == 0))
+        if len(saltos):
+            fin = pos + int(saltos[-1]) + 1
+        abiertas = int(paridad[-1])
+        pos += len(bloque)
+    return fin
+
+
+class _Tramo(io.RawIOBase):
+    """Vista de lectura de f[inicio:fin] precedida por el encabezado guardado."""
+
+    def __init__(self, f, inicio, fin, prefijo=b""):
+        self.f = f
+        self.f.seek(inicio)
+        self.resto = fin - inicio
+        self.prefijo = prefijo
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if self.prefijo:
+            n = min(len(buf), len(self.prefijo))
+            buf[:n] = self.prefijo[:n]
+            self.prefijo = self.prefijo[n:]
+            return n
+        data = self.f.read(min(len(buf), self.resto))
+        self.resto -= len(data)
+        buf[: len(data)] = data
+        return len(data)
+
+
+def _estado_inicial(input_file, st, formato):
+    return {
+        "input": str(Path(input_file).resolve()),
+        "inode": st.st_ino,
+        "formato": formato,
+        "offset": 0,
+        "header": None,
+        "count": 0,
+        "output_size": 0,
+        "rotaciones": 0,
+    }
+
+
+def procesar_incremento(input_file, output_file, formato="csv", chunk_rows=CHUNK_ROWS):
+    """Una pasada del seguimiento: solo las líneas completas nuevas.
+
+    Devuelve los registros agregados. El estado (offset, encabezado, conteo)
+    se guarda después de escribir; si una pasada se corta entre ambos pasos,
+    la siguiente descarta lo escrito sin registrar y lo repite.
+    """
+    path_estado = ruta_estado(output_file)
+    try:
+        estado = json.loads(path_estado.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        estado = None
+    st = os.stat(input_file)
+    if (
+        estado is None
+        or estado["input"] != str(Path(input_file).resolve())
+        or estado["formato"] != formato
+    ):
+        # Primera pasada: desde cero
+        estado = _estado_inicial(input_file, st, formato)
+    elif estado["inode"] != st.st_ino or st.st_size < estado["offset"]:
+        # Rotado / truncado: la entrada vuelve a empezar (con su propio
+        # encabezado) y la salida se conserva; lo nuevo se sigue agregando
+        estado.update(
+            inode=st.st_ino,
+            offset=0,
+            header=None,
+            rotaciones=estado.get("rotaciones", 0) + 1,
+        )
+
+    inicio = estado["offset"]
+    rotaciones = estado.get("rotaciones", 0)
+    nuevo = inicio == 0 and rotaciones == 0  # salida desde cero
+    with open(input_file, "rb") as f:
+        fin = _fin_lineas_completas(f, inicio, st.st_size)
+        if fin == inicio:
+            return 0
+        if inicio == 0:
+            f.seek(0)
+            estado["header"] = f.readline().decode("utf-8")
+        prefijo = b"" if inicio == 0 else estado["header"].encode("utf-8")
+        tramo = io.BufferedReader(_Tramo(f, inicio, fin, prefijo))
+
+        antes = estado["count"]
+        if formato == "parquet":
+            # Nombres por rotación y offset: repetir una pasada reescribe las
+            # mismas partes y no pisa las de archivos anteriores
+            salida = SalidaParquet(
+                output_file, nuevo, f"part-{rotaciones:04d}-{inicio:012d}"
+            )
+            with closing(salida):
+                estado["count"] = _procesar_bloques(tramo, salida, chunk_rows, antes)
+        else:
+            estado["count"] = _agregar_csv(
+                tramo,
+                output_file,
+                nuevo,
+                estado["output_size"],
+                chunk_rows,
+                antes,
+            )
+            estado["output_size"] = os.path.getsize(output_file)
+
+    estado["offset"] = fin
+    _guardar_json(path_estado, estado)
+    return estado["count"] - antes
+
+
+def _agregar_csv(tramo, output_file, nuevo, output_size, chunk_rows, count):
+    """Limpia a un temporal y lo agrega de una vez (o lo renombra si es nuevo)."""
+    output_file = Path(output_file)
+    tmp = output_file.with_name(f".{output_file.name}.tmp")
+    with closing(SalidaCSV(open(tmp, "wb"), encabezado=nuevo)) as salida:
+        count = _procesar_bloques(tramo, salida, chunk_rows, count)
+    if nuevo:
+        os.replace(tmp, output_file)
+        return count
+    with open(output_file, "r+b") as out, open(tmp, "rb") as src:
+        # Lo escrito por una pasada que no alcanzó a guardar su estado se descarta
+        out.truncate(output_size)
+        out.seek(output_size)
+        shutil.copyfileobj(src, out, 1024**2)
+        out.flush()
+        os.fsync(out.fileno())
+    tmp.unlink()
+    return count
+
+
+def _observar(input_file, evento):
+    """Observer de watchdog que marca evento al cambiar input_file (o None)."""
+    if Observer is None:
+        return None
+    objetivo = os.path.abspath(input_file)
+
+    class _Cambios(FileSystemEventHandler):
+        def on_any_event(self, event):
+            rutas = (event.src_path, getattr(event, "dest_path", ""))
+            if objetivo in (os.path.abspath(r) for r in rutas if r):
+                evento.set()
+
+    observer = Observer()
+    observer.schedule(_Cambios(), os.path.dirname(objetivo))
+    observer.start()
+    return observer
+
+
+def seguir(input_file, output_file, formato="csv", intervalo=INTERVALO_S):
+    """Procesa lo nuevo al cambiar el archivo (watchdog) o cada intervalo."""
+    if compresion(input_file):
+        print("Error: el modo seguimiento requiere un CSV sin comprimir.")
+        sys.exit(1)
+    cambio = threading.Event()
+    observer = _observar(input_file, cambio)
+    modo = "watchdog" if observer else f"sondeo cada {intervalo:g} s"
+    print(f"Siguiendo: {input_file} -> {output_file} ({modo}; Ctrl+C para salir)")
+    try:
+        while True:
+            try:
+                nuevos = procesar_incremento(input_file, output_file, formato)
+            except FileNotFoundError:
+                nuevos = 0  # en plena rotación: se reintenta en la próxima vuelta
+            if nuevos:
+                print(f"+{nuevos} registros.")
+            # Con watchdog el intervalo es solo un respaldo
+            cambio.wait(intervalo)
+            cambio.clear()
+    except KeyboardInterrupt:
+        print("Seguimiento detenido.")
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Limpiador y estandarizador de CSVs de Atmos."
     )
-    parser.add_argument("input", help="Ruta del archivo CSV de entrada")
     parser.add_argument(
-        "-o", "--output", help="Ruta del archivo CSV de salida (opcional)"
+        "input",
+        help="CSV de entrada (.csv, .csv.gz, .csv.zst), directorio o glob "
+        "(p.ej. 'datos/*.csv.gz')",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Salida (un archivo) o directorio de salida (lote) (opcional)",
+    )
+    parser.add_argument(
+        "-f",
+        "--formato",
+        choices=FORMATOS,
+        default="csv",
+        help="csv, o parquet particionado por día (un directorio)",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Procesos en paralelo (lote)"
+    )
+    parser.add_argument(
+        "--manifest", help=f"Manifiesto del lote (por defecto {MANIFEST_NAME})"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Reprocesar aunque no haya cambios"
+    )
+    parser.add_argument(
+        "--seguir",
+        action="store_true",
+        help="Seguir el archivo y procesar solo las líneas nuevas (un archivo)",
+    )
+    parser.add_argument(
+        "--intervalo",
+        type=float,
+        default=INTERVALO_S,
+        help="Segundos entre revisiones en modo seguimiento",
     )
 
     args = parser.parse_args()
 
-    input_path = Path(args.input)
-    if not args.output:
-        # Generar nombre de salida automático: archivo_clean.csv
-        output_path = input_path.with_stem(f"{input_path.stem}_clean")
-    else:
-        output_path = Path(args.output)
+    if not es_lote(args.input):
+        input_path = Path(args.input)
+        output_path = (
+            Path(args.output)
+            if args.output
+            else salida_para(input_path, formato=args.formato)
+        )
+        if args.seguir:
+            seguir(input_path, output_path, args.formato, args.intervalo)
+        else:
+            procesar_csv(input_path, output_path, formato=args.formato)
+        return
 
-    procesar_csv(input_path, output_path)
+    _, _, fallidos = procesar_lote(
+        resolver_entradas(args.input),
+        args.output,
+        args.manifest,
+        args.workers,
+        args.force,
+        args.formato,
+    )
+    if fallidos:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,23 @@
+from contextlib import nullcontext
+from uuid import uuid4
+
 import streamlit as st
+from core.derived import DerivedEngine
+from core.profiler import PROFILE_ENABLED, Profiler
+from core.registry import DatasetRegistry
+
+
+@st.cache_resource
+def shared_datasets():
+    """Registro de datasets compartido por todas las sesiones del proceso."""
+    return DatasetRegistry()
 
 
 def init_session():
+    if "session_token" not in st.session_state:
+        st.session_state.session_token = uuid4().hex
+    if "rerun_count" not in st.session_state:
+        st.session_state.rerun_count = 0
     if "formula_input" not in st.session_state:
         st.session_state.formula_input = ""
     if "plot_key" not in st.session_state:
@@ -12,6 +28,73 @@ def init_session():
         st.session_state.roles = None
     if "last_file" not in st.session_state:
         st.session_state.last_file = None
+    if "dataset_fp" not in st.session_state:
+        st.session_state.dataset_fp = None
+    if "ingest_report" not in st.session_state:
+        st.session_state.ingest_report = None
+    if "dataset_lease" not in st.session_state:
+        st.session_state.dataset_lease = None
+    if "derived" not in st.session_state:
+        st.session_state.derived = DerivedEngine()
+    if "index" not in st.session_state:
+        st.session_state.index = None
+    if "trajectories" not in st.session_state:
+        st.session_state.trajectories = None
+    if "store" not in st.session_state:
+        st.session_state.store = None
+    if "filters" not in st.session_state:
+        st.session_state.filters = {}
+    if "compact_report" not in st.session_state:
+        st.session_state.compact_report = None
+    if "data_version" not in st.session_state:
+        st.session_state.data_version = 0
+    if "view_cache" not in st.session_state:
+        st.session_state.view_cache = {}
+    if "block_stats" not in st.session_state:
+        st.session_state.block_stats = None
+    if "pyramid" not in st.session_state:
+        st.session_state.pyramid = None
+    if "memory_mb" not in st.session_state:
+        st.session_state.memory_mb = None
+    if "spatial_index" not in st.session_state:
+        st.session_state.spatial_index = None
+    if "viewport" not in st.session_state:
+        st.session_state.viewport = None
+
+
+def start_profiling():
+    st.session_state.rerun_count += 1
+    enabled = st.session_state.get("profile_on", PROFILE_ENABLED)
+    st.session_state.profiler = (
+        Profiler(st.session_state.session_token, st.session_state.rerun_count)
+        if enabled
+        else None
+    )
+    return st.session_state.profiler
+
+
+def profile(name):
+    """Context manager de una etapa; no hace nada si el perfil está apagado."""
+    profiler = st.session_state.get("profiler")
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def bump_data_version():
+    # Invalida las caches derivadas (reducciones visuales, etc.)
+    st.session_state.data_version += 1
+    st.session_state.view_cache = {}
+    st.session_state.block_stats = None
+    st.session_state.pyramid = None
+    st.session_state.memory_mb = None
+
+
+def cached_view(key, fn, max_entries=8):
+    cache = st.session_state.view_cache
+    if key not in cache:
+        if len(cache) >= max_entries:
+            cache.pop(next(iter(cache)))
+        cache[key] = fn()
+    return cache[key]
 
 
 def append_token(val, is_variable=False):
@@ -29,3 +112,19 @@ def clear_console():
 
 def reset_selection():
     st.session_state.plot_key += 1
+
+
+def zoom_to_selection(chart_key):
+    state = st.session_state.get(chart_key)
+    sel = state["selection"] if state else {}
+    xs, ys = [], []
+    for shape in list(sel.get("box", [])) + list(sel.get("lasso", [])):
+        xs += list(shape.get("x", []))
+        ys += list(shape.get("y", []))
+    if xs and ys:
+        st.session_state.viewport = (min(xs), max(xs), min(ys), max(ys))
+    reset_selection()
+
+
+def reset_viewport():
+    st.session_state.viewport = None
@@ -1,7 +1,11 @@
-import pandas as pd
 import streamlit as st
 
-from state.session import append_token, clear_console
+from state.session import (
+    append_token,
+    bump_data_version,
+    clear_console,
+    profile,
+)
 
 
 def render_calculator():
@@ -36,6 +40,7 @@ def render_calculator():
             st.caption("Operadores")
             st.markdown('<div class="op-btn">', unsafe_allow_html=True)
             ops = ["+", "-", "*", "/", "(", ")", "**2", "sqrt", "log", "mean"]
+            ops += ["rolling(", "diff(", "cumsum(", "lag(", ",", "by="]
             cols_ops = st.columns(2)
             for i, op in enumerate(ops):
                 cols_ops[i % 2].button(
@@ -46,6 +51,7 @@ def render_calculator():
                     use_container_width=True,
                 )
             st.markdown("</div>", unsafe_allow_html=True)
+            st.caption("Ej: rolling(`speed`, 10, by=`equipo`)")
 
         with col_term:
             st.caption("Fórmula")
@@ -69,21 +75,30 @@ def render_calculator():
 
             if c_act1.button("⚡ Calcular", type="primary", use_container_width=True):
                 if st.session_state.formula_input and new_name:
+                    engine = st.session_state.derived
+                    kind = (
+                        "categorical"
+                        if var_type == "Categórica (Discreta)"
+                        else "numeric"
+                    )
                     try:
-                        res = st.session_state.df_master.eval(
-                            st.session_state.formula_input
+                        engine.define(
+                            new_name,
+                            st.session_state.formula_input,
+                            kind,
+                            st.session_state.df_master.columns,
+                        )
+                        with profile("derived.materialize"):
+                            engine.materialize(
+                                st.session_state.df_master,
+                                st.session_state.dataset_fp,
+                            )
+                        if new_name in engine.errors:
+                            raise ValueError(engine.errors[new_name])
+                        engine.sync_roles(
+                            st.session_state.roles, st.session_state.df_master
                         )
-                        if var_type == "Categórica (Discreta)":
-                            res = res.astype(str)
-                            if new_name in st.session_state.roles["numeric"]:
-                                st.session_state.roles["numeric"].remove(new_name)
-                        else:
-                            res = pd.to_numeric(res, errors="coerce")
-                            if pd.api.types.is_numeric_dtype(res):
-                                if new_name not in st.session_state.roles["numeric"]:
-                                    st.session_state.roles["numeric"].append(new_name)
-
-                        st.session_state.df_master[new_name] = res
+                        bump_data_version()
                         st.success(f"Creada: {new_name}")
                         st.rerun()
                     except Exception as e:
@@ -93,3 +108,34 @@ def render_calculator():
                 "Borrar", on_click=clear_console, use_container_width=True
             ):
                 pass
+
+        render_derived_list()
+
+
+def _remove_derived(name):
+    try:
+        st.session_state.derived.remove(name)
+    except ValueError as e:
+        st.session_state.derived.errors[name] = str(e)
+        return
+    df = st.session_state.df_master
+    if name in df.columns:
+        df.drop(columns=[name], inplace=True)
+    if name in st.session_state.roles["numeric"]:
+        st.session_state.roles["numeric"].remove(name)
+    bump_data_version()
+
+
+def render_derived_list():
+    engine = st.session_state.derived
+    if not engine.formulas:
+        return
+    st.caption("Variables derivadas (se recalculan al recargar datos)")
+    for name in engine.order():
+        f = engine.formulas[name]
+        c_info, c_del = st.columns([6, 1])
+        icon = "⚠️" if name in engine.errors else "🔗"
+        c_info.markdown(f"{icon} **{name}** = `` {f.text} `` · _{f.backend}_")
+        if name in engine.errors:
+            c_info.caption(engine.errors[name])
+        c_del.button("🗑️", key=f"del_{name}", on_click=_remove_derived, args=(name,))
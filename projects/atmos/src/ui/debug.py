@@ -0,0 +1,25 @@
+import pandas as pd
+import streamlit as st
+from core.profiler import PROFILE_LOG
+
+
+def render_profile(profiler):
+    with st.expander("⏱️ Perfil de esta ejecución"):
+        if not profiler.records:
+            st.caption("Sin etapas registradas.")
+            return
+        df = pd.DataFrame(profiler.records).sort_values("start_ms")
+        df["stage"] = ["· " * d + s for d, s in zip(df["depth"], df["stage"])]
+        st.dataframe(
+            df[["stage", "ms", "delta_mb", "rss_mb"]].rename(
+                columns={
+                    "stage": "Etapa",
+                    "ms": "Tiempo (ms)",
+                    "delta_mb": "Δ Memoria (MB)",
+                    "rss_mb": "RSS (MB)",
+                }
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption(f"Ejecución #{profiler.run} · log: {PROFILE_LOG}")
@@ -1,60 +1,414 @@
+import os
 from datetime import timedelta
+from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
-
+from core import cache
+from core.compact import compact_frame
 from core.data import detect_roles_fast, load_data_fast
+from core.derived import DerivedEngine
+from core.index import FilterIndex, sort_by_time
+from core.multi import (
+    combined_fingerprint,
+    concat_frames,
+    dedupe_entity_time,
+    list_sources,
+    parse_many,
+)
+from core.profiler import PROFILE_ENABLED
+from core.snapshot import (
+    delete_snapshot,
+    list_snapshots,
+    load_snapshot,
+    save_snapshot,
+    snapshot_name,
+)
+from core.store import DEFAULT_BUDGET_MB, ChunkedStore
+from core.trajectory import build_trajectories
+from state.session import bump_data_version, profile, shared_datasets
+
+COMPACT_TOLERANCES = {"Sin pérdida": 0.0, "1e-7": 1e-7, "1e-6": 1e-6, "1e-4": 1e-4}
+# Raíz para "Ruta local": sin definir no se ofrece (lectura de rutas del servidor)
+LOCAL_ROOT = os.environ.get("ATMOS_LOCAL_ROOT", "")
+
+
+def _release_dataset():
+    if st.session_state.dataset_lease is not None:
+        st.session_state.dataset_lease.release()
+        st.session_state.dataset_lease = None
+
+
+def _install_frame(df, roles, fp, index=None, lease=None):
+    _release_dataset()
+    st.session_state.dataset_lease = lease
+    st.session_state.df_master = df
+    st.session_state.roles = roles
+    st.session_state.index = index if index is not None else FilterIndex(df, roles)
+    st.session_state.trajectories = (
+        lease.trajectories
+        if lease is not None
+        else build_trajectories(df, roles, st.session_state.index)
+    )
+    st.session_state.dataset_fp = fp
+    st.session_state.spatial_index = None
+    st.session_state.block_stats = None
+    st.session_state.viewport = None
+    st.session_state.store = None
+    st.session_state.compact_report = None
+
+
+def _build_shared(load, fp):
+    res = load()
+    if not isinstance(res, pd.DataFrame):
+        raise ValueError(res)
+    roles = detect_roles_fast(res, fp)
+    res = sort_by_time(res, roles)
+    index = FilterIndex(res, roles)
+    return res, roles, index, build_trajectories(res, roles, index)
+
+
+def _load_in_memory(buf, name, fp):
+    return _load_shared(fp, lambda: load_data_fast(buf, name, fp))
+
+
+def _concat_sources(sources, fps, fp, dedupe):
+    df = cache.get(fp)
+    if df is not None:
+        return df
+    try:
+        df = concat_frames(parse_many(sources, fps))
+    except Exception as e:
+        return str(e)
+    report = f"{len(sources)} archivos · {len(df):,} filas"
+    if dedupe:
+        df, n_dup = dedupe_entity_time(df, detect_roles_fast(df))
+        report += f" · {n_dup:,} duplicadas descartadas"
+    st.session_state.ingest_report = report
+    cache.put(fp, df)
+    return df
+
+
+def _load_many(sources, fps, dedupe):
+    """Varios archivos (uno por turno/día) como un solo dataset en memoria."""
+    fp = combined_fingerprint(fps, dedupe)
+    return _load_shared(fp, lambda: _concat_sources(sources, fps, fp, dedupe))
+
+
+def _load_shared(fp, load):
+    # Una sola copia por huella en el proceso; la sesión trabaja sobre una vista
+    try:
+        with profile("dataset"):
+            lease = shared_datasets().acquire(fp, lambda: _build_shared(load, fp))
+    except ValueError as e:
+        return str(e)
+    res, roles = lease.frame(), lease.roles()
+    _install_frame(res, roles, fp, index=lease.index, lease=lease)
+    # Las fórmulas guardadas se reaplican sobre los datos recién cargados
+    with profile("derived.materialize"):
+        st.session_state.derived.materialize(res, fp)
+    st.session_state.derived.sync_roles(roles, res)
+    if st.session_state.get("compact_on_load"):
+        _compact()
+    return res
+
+
+def _open_snapshot(name, source=None):
+    try:
+        df, meta = load_snapshot(name)
+        # El snapshot ya viene ordenado y con las derivadas calculadas
+        engine = DerivedEngine()
+        for f in meta["formulas"]:
+            engine.define(f["name"], f["text"], f["kind"], df.columns)
+    except (OSError, ValueError, KeyError) as e:
+        st.error(f"No se pudo abrir '{name}': {e}")
+        return False
+    engine.adopt(df, meta["fingerprint"])
+    st.session_state.derived = engine
+    _install_frame(df, meta["roles"], meta["fingerprint"])
+    # Con la fuente actual como "cargada" el uploader no pisa el snapshot
+    st.session_state.last_file = source
+    st.session_state.formula_input = ""
+    st.query_params["ws"] = name
+    bump_data_version()
+    return True
+
+
+def _save_snapshot(name):
+    name = save_snapshot(
+        name,
+        st.session_state.df_master,
+        st.session_state.roles,
+        st.session_state.derived,
+        source=st.session_state.last_file,
+        fingerprint=st.session_state.dataset_fp,
+    )
+    st.query_params["ws"] = name
+    st.toast(f"💾 Workspace '{name}' guardado")
+
+
+def _delete_snapshot(name):
+    delete_snapshot(name)
+    if st.query_params.get("ws") == name:
+        st.query_params.pop("ws", None)
+    st.toast(f"🗑️ Workspace '{name}' borrado")
+
+
+def _compact():
+    rtol = COMPACT_TOLERANCES[st.session_state.get("compact_rtol", "Sin pérdida")]
+    st.session_state.compact_report = compact_frame(
+        st.session_state.df_master, st.session_state.roles, rtol
+    )
+    # Los dtypes cambiaron en sitio: las vistas y stats cacheadas quedan viejas
+    bump_data_version()
+
+
+def _load_out_of_core(file_obj, fp, budget):
+    try:
+        store = ChunkedStore.open_or_ingest(file_obj, fp, budget)
+    except (pa.ArrowException, ValueError, OSError) as e:
+        return str(e)
+    _release_dataset()
+    st.session_state.store = store
+    st.session_state.trajectories = None
+    st.session_state.df_master = None
+    st.session_state.index = None
+    st.session_state.roles = store.roles
+    return store
+
+
+def _resolve_local(raw):
+    """Ruta bajo LOCAL_ROOT (relativas a ella) o None si escapa de la raíz."""
+    root = Path(LOCAL_ROOT).resolve()
+    path = (root / raw).resolve()
+    return str(path) if path.is_relative_to(root) else None
+
+
+def _source_key(uploaded_files, local_path, dedupe):
+    if local_path:
+        key = local_path
+    elif uploaded_files:
+        key = "|".join(f.name for f in uploaded_files)
+    else:
+        return None
+    multi = len(uploaded_files or []) > 1 or (local_path and Path(local_path).is_dir())
+    return f"{key}#dedupe" if multi and dedupe else key
+
+
+def _load_source(uploaded_files, local_path, budget):
+    budget_bytes = budget * 1024**2
+    dedupe = st.session_state.get("dedupe_on_load", False)
+    st.session_state.ingest_report = None
+    if local_path and Path(local_path).is_dir():
+        paths = list_sources(local_path)
+        if not paths:
+            st.error(f"Sin archivos CSV/XLSX/Parquet en: {local_path}")
+            return
+        res = _load_many(paths, [cache.fingerprint_file(p) for p in paths], dedupe)
+        if not isinstance(res, pd.DataFrame):
+            st.error(f"Error: {res}")
+            return
+    elif local_path:
+        path = Path(local_path)
+        if not path.is_file():
+            st.error(f"No existe: {path}")
+            return
+        fp = cache.fingerprint_file(path)
+        if path.suffix.lower() == ".csv" and path.stat().st_size > budget_bytes:
+            with open(path, "rb") as f:
+                res = _load_out_of_core(f, fp, budget)
+            if isinstance(res, str):
+                st.error(f"Error: {res}")
+                return
+        else:
+            res = _load_in_memory(path.read_bytes(), path.name, fp)
+            if not isinstance(res, pd.DataFrame):
+                st.error(f"Error: {res}")
+                return
+    elif len(uploaded_files) > 1:
+        sources = [(f.name, f.getvalue()) for f in uploaded_files]
+        fps = [cache.fingerprint(payload, name) for name, payload in sources]
+        res = _load_many(sources, fps, dedupe)
+        if not isinstance(res, pd.DataFrame):
+            st.error(f"Error: {res}")
+            return
+    else:
+        uploaded_file = uploaded_files[0]
+        with uploaded_file.getbuffer() as buf:
+            fp = cache.fingerprint(buf, uploaded_file.name)
+            if uploaded_file.name.endswith(".csv") and buf.nbytes > budget_bytes:
+                uploaded_file.seek(0)
+                res = _load_out_of_core(uploaded_file, fp, budget)
+                if isinstance(res, str):
+                    st.error(f"Error: {res}")
+                    return
+            else:
+                res = _load_in_memory(buf, uploaded_file.name, fp)
+                if not isinstance(res, pd.DataFrame):
+                    st.error(f"Error: {res}")
+                    return
+    st.session_state.last_file = _source_key(uploaded_files, local_path, dedupe)
+    st.session_state.formula_input = ""
+    st.query_params.pop("ws", None)
+    bump_data_version()
+    st.rerun()
+
+
+def _filter_widgets(roles, uniques, tmin, tmax):
+    ents, trange = None, None
+    if roles["entity"]:
+        ents = st.multiselect(f"{roles['entity']}", uniques, default=uniques)
+
+    if roles["time"] and pd.notnull(tmin) and pd.notnull(tmax):
+        min_v, max_v = tmin.to_pydatetime(), tmax.to_pydatetime()
+        if min_v != max_v:
+            trange = st.slider(
+                "Rango Temporal",
+                min_value=min_v,
+                max_value=max_v,
+                value=(min_v, max_v),
+                format="DD/MM/YY HH:mm",
+                step=timedelta(minutes=1),
+            )
+    return ents, trange
 
 
 def render_sidebar():
     with st.sidebar:
         st.header("🗂️ Proyecto")
-        uploaded_file = st.file_uploader("Datos", type=["csv", "xlsx"], key="upl_main")
-
-        if uploaded_file:
-            if st.session_state.get("last_file") != uploaded_file.name:
-                with st.spinner("Procesando..."):
-                    res = load_data_fast(uploaded_file.getvalue(), uploaded_file.name)
-                    if isinstance(res, pd.DataFrame):
-                        st.session_state.df_master = res
-                        st.session_state.roles = detect_roles_fast(res)
-                        st.session_state.last_file = uploaded_file.name
-                        st.session_state.formula_input = ""
+        uploaded_files = st.file_uploader(
+            "Datos",
+            type=["csv", "xlsx", "parquet"],
+            key="upl_main",
+            accept_multiple_files=True,
+            help="Varios archivos (p.ej. uno por turno) se cargan como un solo dataset.",
+        )
+
+        with st.expander("⚙️ Ingesta"):
+            budget = st.number_input(
+                "Presupuesto de memoria (MB)",
+                min_value=64,
+                value=DEFAULT_BUDGET_MB,
+                step=64,
+                key="mem_budget",
+                help="Los CSV mayores a este tamaño se procesan por bloques en disco.",
+            )
+            local_path = ""
+            if LOCAL_ROOT:
+                raw = st.text_input(
+                    "Ruta local (archivo o directorio)",
+                    key="local_path",
+                    help=f"Relativa a {LOCAL_ROOT}; no se admiten rutas fuera de ella.",
+                ).strip()
+                if raw:
+                    local_path = _resolve_local(raw)
+                    if local_path is None:
+                        st.error(f"Fuera de {LOCAL_ROOT}: {raw}")
+                        local_path = ""
+            st.checkbox(
+                "🧹 Quitar duplicados (entidad, tiempo)",
+                key="dedupe_on_load",
+                help="Al unir varios archivos, conserva la última fila repetida.",
+            )
+            if st.session_state.get("ingest_report"):
+                st.caption(st.session_state.ingest_report)
+            st.checkbox("🗜️ Compactar al cargar", key="compact_on_load")
+            st.selectbox(
+                "Tolerancia float32", list(COMPACT_TOLERANCES), key="compact_rtol"
+            )
+            st.checkbox("⏱️ Perfilar ejecuciones", PROFILE_ENABLED, key="profile_on")
+
+        source = _source_key(
+            uploaded_files, local_path, st.session_state.get("dedupe_on_load")
+        )
+        ws = st.query_params.get("ws")
+        if ws and snapshot_name(ws) != ws:
+            st.query_params.pop("ws", None)  # no es un nombre que se haya guardado
+            ws = None
+        if ws and st.session_state.df_master is None and st.session_state.store is None:
+            # Recarga del navegador / reinicio del servidor: se reabre el workspace
+            _open_snapshot(ws, source)
+        elif source and st.session_state.get("last_file") != source:
+            with st.spinner("Procesando..."), profile("load"):
+                _load_source(uploaded_files, local_path, budget)
+
+        with st.expander("💾 Workspace"):
+            saved = list_snapshots()
+            if saved:
+                choice = st.selectbox("Guardados", saved, key="ws_choice")
+                col_open, col_del = st.columns(2)
+                if col_open.button("📂 Abrir", use_container_width=True):
+                    if _open_snapshot(choice, source):
                         st.rerun()
-                    else:
-                        st.error(f"Error: {res}")
+                col_del.button(
+                    "🗑️ Borrar",
+                    on_click=_delete_snapshot,
+                    args=(choice,),
+                    use_container_width=True,
+                )
+            if st.session_state.df_master is not None:
+                default = Path(st.session_state.last_file or "workspace").stem
+                name = st.text_input("Nombre", value=default, key="ws_name")
+                st.button(
+                    "💾 Guardar",
+                    on_click=_save_snapshot,
+                    args=(name,),
+                    use_container_width=True,
+                )
+            elif st.session_state.store is not None:
+                st.caption("El modo out-of-core ya persiste en disco.")
 
-        if st.session_state.df_master is None:
+        store = st.session_state.store
+        if st.session_state.df_master is None and store is None:
             st.info("Carga un archivo para comenzar.")
             st.stop()
 
-        df = st.session_state.df_master.copy()
         roles = st.session_state.roles
 
+        if store is None:
+            with st.expander("🗜️ Memoria"):
+                st.button("Compactar ahora", on_click=_compact, use_container_width=True)
+                if st.session_state.get("compact_report") is not None:
+                    st.dataframe(st.session_state.compact_report)
+                else:
+                    if st.session_state.memory_mb is None:
+                        # deep=True recorre los textos: una vez por versión de datos
+                        st.session_state.memory_mb = (
+                            st.session_state.df_master.memory_usage(deep=True).sum()
+                            / 1024**2
+                        )
+                    st.caption(f"Uso actual: {st.session_state.memory_mb:,.1f} MB")
+                lease = st.session_state.dataset_lease
+                if lease is not None:
+                    st.caption(
+                        f"🔗 Base compartida con {len(lease.entry.leases)} sesión(es)"
+                    )
+
         st.markdown("---")
         st.subheader("✂️ Filtros Base")
 
-        if roles["entity"]:
-            uniques = sorted(df[roles["entity"]].astype(str).unique())
-            ents = st.multiselect(f"{roles['entity']}", uniques, default=uniques)
-            df = df[df[roles["entity"]].isin(ents)]
-
-        if roles["time"]:
-            tmin, tmax = df[roles["time"]].min(), df[roles["time"]].max()
-            if pd.notnull(tmin) and pd.notnull(tmax):
-                min_v, max_v = tmin.to_pydatetime(), tmax.to_pydatetime()
-                if min_v != max_v:
-                    trange = st.slider(
-                        "Rango Temporal",
-                        min_value=min_v,
-                        max_value=max_v,
-                        value=(min_v, max_v),
-                        format="DD/MM/YY HH:mm",
-                        step=timedelta(minutes=1),
-                    )
-                    df = df[
-                        (df[roles["time"]] >= trange[0])
-                        & (df[roles["time"]] <= trange[1])
-                    ]
+        if store is not None:
+            tmin, tmax = store.time_range()
+            uniques = store.entities()
+            ents, trange = _filter_widgets(roles, uniques, tmin, tmax)
+            st.session_state.filters = {
+                "entities": ents if ents is not None and len(ents) < len(uniques) else None,
+                "trange": trange,
+            }
+            total = store.count(st.session_state.filters)
+            with profile("filter"):
+                df = store.query(
+                    st.session_state.filters, max_rows=store.window_rows(budget)
+                )
+            st.caption(f"💽 Out-of-core: ventana {len(df):,} / {total:,} filas")
+            return df
 
-        return df
+        index = st.session_state.index
+        tmin, tmax = index.time_bounds()
+        ents, trange = _filter_widgets(roles, index.entities, tmin, tmax)
+        st.session_state.filters = {"entities": ents, "trange": trange}
+
+        # Búsqueda binaria + particiones; sin filtro de entidad es una vista
+        with profile("filter"):
+            return index.select(st.session_state.df_master, ents, trange)
@@ -0,0 +1,21 @@
+import streamlit as st
+from state.session import cached_view
+
+
+def render_trajectories():
+    traj = st.session_state.trajectories
+    filters = st.session_state.filters
+    st.markdown("### 🚚 Trayectorias")
+    with st.expander("Distancia y detenciones por entidad"):
+        # Cada entidad se resuelve con búsqueda binaria sobre su tramo temporal
+        key = ("trajectories", st.session_state.data_version, str(filters))
+        summary, dwells = cached_view(
+            key,
+            lambda: (
+                traj.summary(filters.get("entities"), filters.get("trange")),
+                traj.dwells_in(filters.get("entities"), filters.get("trange")),
+            ),
+        )
+        st.dataframe(summary, hide_index=True, use_container_width=True)
+        st.caption(f"🛑 Detenciones ({len(dwells):,})")
+        st.dataframe(dwells, hide_index=True, use_container_width=True)
@@ -1,8 +1,27 @@
 import pandas as pd
 import plotly.express as px
 import streamlit as st
-
-from state.session import reset_selection
+from core.downsample import downsample_positions
+from core.export import EXPORT_FORMATS, frame_chunks, lazy_export
+from core.profiler import logged
+from core.pyramid import TimePyramid
+from core.selection import (
+    frame_selection,
+    polygons_bbox,
+    select_positions,
+    selection_polygons,
+)
+from core.spatial import GridIndex, keep_filter
+from core.stats import BlockStats, range_metrics, slice_metrics
+from state.session import (
+    cached_view,
+    profile,
+    reset_selection,
+    reset_viewport,
+    zoom_to_selection,
+)
+
+MAX_POINTS = 50000
 
 
 def get_idx(opts, targets, default=0):
@@ -12,40 +31,132 @@ def get_idx(opts, targets, default=0):
     return default
 
 
+def spatial_index(roles):
+    """GridIndex de df_master, construido una sola vez por dataset."""
+    cols = (roles["spatial"]["x"], roles["spatial"]["y"])
+    cached = st.session_state.spatial_index
+    if cached is None or cached[0] != cols:
+        df = st.session_state.df_master
+        cached = (cols, GridIndex(df[cols[0]].to_numpy(), df[cols[1]].to_numpy()))
+        st.session_state.spatial_index = cached
+    return cached[1]
+
+
 def generate_metrics(data_slice, name, x_axis, y_axis, color_var, size_var):
-    metrics = {"Scope": name, "Count": len(data_slice), "Channels": {}}
-    if data_slice.empty:
-        return metrics
     active_vars = [
         v
-        for v in [x_axis, y_axis, color_var, size_var]
+        for v in dict.fromkeys([x_axis, y_axis, color_var, size_var])
         if v and v in data_slice.columns
     ]
+    return slice_metrics(data_slice, name, active_vars)
 
-    for v in active_vars:
-        if pd.api.types.is_numeric_dtype(data_slice[v]):
-            metrics["Channels"][v] = {
-                "Type": "Numeric",
-                "Min": float(data_slice[v].min()),
-                "Max": float(data_slice[v].max()),
-                "Avg": float(data_slice[v].mean()),
-                "Std": float(data_slice[v].std()),
-            }
-        elif pd.api.types.is_datetime64_any_dtype(data_slice[v]):
-            metrics["Channels"][v] = {
-                "Type": "DateTime",
-                "Start": str(data_slice[v].min()),
-                "End": str(data_slice[v].max()),
-            }
-        else:
-            metrics["Channels"][v] = {
-                "Type": "Categorical",
-                "Unique": int(data_slice[v].nunique()),
-                "Top": str(data_slice[v].mode().iloc[0])
-                if not data_slice[v].empty
-                else "-",
-            }
-    return metrics
+
+def global_metrics_for(df, x_axis, y_axis, color_var, size_var):
+    """Métricas del filtro actual: bloques precalculados si el filtro es contiguo."""
+    index = st.session_state.index
+    filters = st.session_state.filters
+    cols = [
+        v
+        for v in dict.fromkeys([x_axis, y_axis, color_var, size_var])
+        if v and v in df.columns
+    ]
+    lo, hi, pos = index.positions(filters.get("entities"), filters.get("trange"))
+    if pos is not None:
+        return generate_metrics(df, "GLOBAL", x_axis, y_axis, color_var, size_var)
+
+    if st.session_state.block_stats is None:
+        st.session_state.block_stats = BlockStats(len(st.session_state.df_master))
+    return range_metrics(
+        st.session_state.block_stats, st.session_state.df_master, "GLOBAL", cols, lo, hi
+    )
+
+
+def time_pyramid():
+    """TimePyramid de df_master; se descarta con cada bump_data_version."""
+    if st.session_state.pyramid is None:
+        st.session_state.pyramid = TimePyramid(
+            st.session_state.df_master, st.session_state.index
+        )
+    return st.session_state.pyramid
+
+
+def _n_entities(roles):
+    """Entidades del filtro activo, sin recorrer el frame (nunique por rerun)."""
+    if not roles["entity"]:
+        return 1
+    ents = st.session_state.filters.get("entities")
+    if ents is None:
+        index, store = st.session_state.index, st.session_state.store
+        ents = index.entities if index is not None else store.entities()
+    return max(len(ents), 1)
+
+
+def pyramid_view(df, roles, y_axis, width, color_var, size_var):
+    """(nivel, buckets) si conviene graficar agregados; None para filas crudas."""
+    index = st.session_state.index
+    if (
+        index is None
+        or index.times is None
+        or size_var
+        or color_var not in (None, roles["entity"], roles["time"])
+        or not pd.api.types.is_numeric_dtype(df[y_axis])
+    ):
+        return None
+    filters = st.session_state.filters
+    tmin, tmax = filters.get("trange") or index.time_bounds()
+    if tmin is None:
+        return None
+    ents = filters.get("entities")
+    n_ent = _n_entities(roles)
+    pyramid = time_pyramid()
+    level = pyramid.choose_level(
+        (pd.Timestamp(tmax) - pd.Timestamp(tmin)).value,
+        width,
+        len(df),
+        n_ent,
+        MAX_POINTS,
+        ents,
+        filters.get("trange"),
+    )
+    if level is None:
+        return None
+    return level, pyramid.frame(y_axis, level, ents, filters.get("trange"))
+
+
+def _plottable(s):
+    return pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s)
+
+
+def full_selection(df, roles, x_axis, y_axis, selection, is_spatial):
+    """Filas (de df_master o df) dentro de la caja/lazo, sin pasar por la muestra.
+
+    None si la selección no tiene geometría aplicable (clics, ejes categóricos).
+    """
+    if not (_plottable(df[x_axis]) and _plottable(df[y_axis])):
+        return None
+    polygons = selection_polygons(
+        selection,
+        pd.api.types.is_datetime64_any_dtype(df[x_axis]),
+        pd.api.types.is_datetime64_any_dtype(df[y_axis]),
+    )
+    if not polygons:
+        return None
+    if is_spatial:
+        # La grilla acota los candidatos al bbox y aplica el filtro base
+        grid = spatial_index(roles)
+        filters = st.session_state.filters
+        keep = keep_filter(
+            *st.session_state.index.positions(
+                filters.get("entities"), filters.get("trange")
+            )
+        )
+        x0, x1, y0, y1 = polygons_bbox(polygons)
+        pos = select_positions(
+            grid.x, grid.y, polygons, grid.candidates((x0, x1, y0, y1), keep)
+        )
+        return st.session_state.df_master.iloc[pos]
+    sorted_x = x_axis == roles["time"] and st.session_state.store is None
+    return df.iloc[frame_selection(df, x_axis, y_axis, polygons, sorted_x)]
 
 
 def render_visuals(df, roles):
@@ -88,6 +199,14 @@ def render_visuals(df, roles):
     # =============================================================================
     st.divider()
 
+    is_spatial = (
+        x_axis == roles["spatial"]["x"]
+        and y_axis == roles["spatial"]["y"]
+        and x_axis is not None
+        and st.session_state.index is not None
+    )
+    chart_key = f"main_{st.session_state.plot_key}"
+
     c_tool, c_reset = st.columns([4, 1])
     with c_tool:
         drag_mode = st.radio(
@@ -97,11 +216,108 @@ def render_visuals(df, roles):
         st.write("")
         st.button("🧹 Limpiar", on_click=reset_selection, use_container_width=True)
 
-    plot_df = df.copy()
+    viewport = st.session_state.viewport if is_spatial else None
+    if is_spatial:
+        c_zoom, c_full = st.columns(2)
+        c_zoom.button(
+            "🔍 Zoom a selección",
+            on_click=zoom_to_selection,
+            args=(chart_key,),
+            use_container_width=True,
+        )
+        c_full.button(
+            "↩️ Vista completa",
+            on_click=reset_viewport,
+            disabled=viewport is None,
+            use_container_width=True,
+        )
 
-    if len(plot_df) > 50000:
-        plot_df = plot_df.sample(50000, random_state=42)
+    error_y = None  # (+, -) solo para buckets de la pirámide
+    if is_spatial:
+        # Nivel de detalle: solo los puntos del viewport, densidad acotada por celda
+        filters = st.session_state.filters
+        key = ("grid", st.session_state.data_version, str(filters), viewport)
+        with profile("lod"):
+            pos = cached_view(
+                key,
+                lambda: spatial_index(roles).query(
+                    viewport,
+                    keep_filter(
+                        *st.session_state.index.positions(
+                            filters.get("entities"), filters.get("trange")
+                        )
+                    ),
+                    MAX_POINTS,
+                ),
+            )
+        with profile("copy"):
+            plot_df = st.session_state.df_master.iloc[pos].copy()
+        if len(plot_df) < len(df) or viewport:
+            st.caption(f"🗺️ Viewport: {len(plot_df):,} / {len(df):,} puntos")
+    elif len(df) > MAX_POINTS and roles["time"] and x_axis == roles["time"]:
+        c_method, c_width = st.columns(2)
+        method = c_method.radio(
+            "Reducción",
+            ["Pirámide", "LTTB", "Min/Max"],
+            horizontal=True,
+            key="ds_method",
+        )
+        width = c_width.number_input(
+            "Ancho objetivo (px)", 200, 8000, 1600, step=100, key="ds_width"
+        )
+        key = (
+            st.session_state.data_version,
+            str(st.session_state.filters),
+            x_axis,
+            y_axis,
+            method,
+            width,
+        )
+        view = None
+        if method == "Pirámide":
+            with profile("pyramid"):
+                view = cached_view(
+                    key + (color_var, size_var),
+                    lambda: pyramid_view(df, roles, y_axis, width, color_var, size_var),
+                )
+        if view is not None:
+            level, plot_df = view
+            plot_df = plot_df.copy()
+            error_y = (f"{y_axis} máx", f"{y_axis} mín")
+            plot_df[error_y[0]] = plot_df[error_y[0]] - plot_df[y_axis]
+            plot_df[error_y[1]] = plot_df[y_axis] - plot_df[error_y[1]]
+            st.caption(
+                f"🔺 Pirámide {level}: {len(plot_df):,} buckets / {len(df):,} filas"
+                " (barras = mín/máx)"
+            )
+        else:
+            # Ventana angosta (o gráfico no agregable): reducción de filas crudas
+            ds = "Min/Max" if method == "Min/Max" else "LTTB"
+            n_ent = _n_entities(roles)
+            per_pixel = 1 if ds == "LTTB" else 4
+            n_points = max(min(width * per_pixel, MAX_POINTS // max(n_ent, 1)), 10)
+            with profile("downsample"):
+                pos = cached_view(
+                    key[:4] + (ds, width),
+                    lambda: downsample_positions(
+                        df,
+                        x_axis,
+                        y_axis,
+                        roles["entity"],
+                        n_points,
+                        "lttb" if ds == "LTTB" else "minmax",
+                    ),
+                )
+            with profile("copy"):
+                plot_df = df.iloc[pos].copy()
+            st.caption(f"📉 {ds}: {len(plot_df):,} / {len(df):,} puntos")
+    elif len(df) > MAX_POINTS:
+        with profile("sample"):
+            plot_df = df.sample(MAX_POINTS, random_state=42)
         st.caption(f"⚠️ Muestreo visual (50k / {len(df):,})")
+    else:
+        with profile("copy"):
+            plot_df = df.copy()
 
     # Truco para Gradiente de Tiempo
     color_col_for_plot = color_var
@@ -109,22 +325,29 @@ def render_visuals(df, roles):
         plot_df["_color_numeric"] = plot_df[color_var].astype("int64") // 10**9
         color_col_for_plot = "_color_numeric"
 
-    fig = px.scatter(
-        plot_df,
-        x=x_axis,
-        y=y_axis,
-        color=color_col_for_plot,
-        size=size_var,
-        color_continuous_scale=palette if (is_num or is_dt) else None,
-        color_discrete_sequence=getattr(px.colors.qualitative, palette)
-        if not (is_num or is_dt) and palette in dir(px.colors.qualitative)
-        else None,
-        opacity=0.7,
-        hover_data={color_col_for_plot: False, color_var: True, roles["entity"]: True}
-        if roles["entity"] and color_var
-        else None,
-        title=f"{y_axis} vs {x_axis}",
-    )
+    with profile("px.scatter"):
+        fig = px.scatter(
+            plot_df,
+            x=x_axis,
+            y=y_axis,
+            color=color_col_for_plot,
+            size=size_var,
+            error_y=error_y[0] if error_y else None,
+            error_y_minus=error_y[1] if error_y else None,
+            color_continuous_scale=palette if (is_num or is_dt) else None,
+            color_discrete_sequence=getattr(px.colors.qualitative, palette)
+            if not (is_num or is_dt) and palette in dir(px.colors.qualitative)
+            else None,
+            opacity=0.7,
+            hover_data={
+                color_col_for_plot: False,
+                color_var: True,
+                roles["entity"]: True,
+            }
+            if roles["entity"] and color_var
+            else None,
+            title=f"{y_axis} vs {x_axis}",
+        )
 
     if is_dt and color_var:
         fig.update_layout(coloraxis_colorbar=dict(title=color_var))
@@ -136,8 +359,12 @@ def render_visuals(df, roles):
         fig.update_yaxes(scaleanchor="x", scaleratio=1)
         st.caption("🔒 Escala Espacial 1:1")
 
+    if viewport:
+        fig.update_xaxes(range=[viewport[0], viewport[1]])
+        fig.update_yaxes(range=[viewport[2], viewport[3]])
+
     # --- MAGIA DE PERSISTENCIA ---
-    ui_rev = f"{x_axis}_{y_axis}"
+    ui_rev = f"{x_axis}_{y_axis}_{viewport}"
 
     fig.update_layout(
         height=600,
@@ -148,38 +375,107 @@ def render_visuals(df, roles):
         uirevision=ui_rev,
     )
 
-    selection = st.plotly_chart(
-        fig,
-        use_container_width=True,
-        on_select="rerun",
-        selection_mode=("box", "lasso"),
-        key=f"main_{st.session_state.plot_key}",
-    )
+    with profile("plotly_chart"):
+        selection = st.plotly_chart(
+            fig,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode=("box", "lasso"),
+            key=chart_key,
+        )
 
     # =============================================================================
     # TELEMETRÍA
     # =============================================================================
     st.markdown("### 📊 Telemetría Comparativa")
 
-    global_metrics = generate_metrics(df, "GLOBAL", x_axis, y_axis, color_var, size_var)
+    store = st.session_state.get("store")
+    if store is not None:
+        filters = st.session_state.filters
+        cols = [x_axis, y_axis, color_var, size_var]
+        # Cada cálculo recorre todas las partes Parquet: se memoiza por almacén
+        key = ("store_metrics", store.path.name, str(filters), *cols)
+        with profile("metrics.global"):
+            global_metrics = cached_view(
+                key, lambda: store.metrics("GLOBAL", cols, filters)
+            )
+    else:
+        key = (
+            "metrics",
+            st.session_state.data_version,
+            str(st.session_state.filters),
+            x_axis,
+            y_axis,
+            color_var,
+            size_var,
+        )
+        with profile("metrics.global"):
+            global_metrics = cached_view(
+                key,
+                lambda: global_metrics_for(df, x_axis, y_axis, color_var, size_var),
+            )
 
-    if selection and len(selection["selection"]["point_indices"]) > 0:
-        indices = selection["selection"]["point_indices"]
-        selected_df = plot_df.iloc[indices]
-        selection_metrics = generate_metrics(
-            selected_df, "SELECCIÓN", x_axis, y_axis, color_var, size_var
+    sel = selection["selection"] if selection else {}
+    selected_df = None
+    if sel.get("box") or sel.get("lasso"):
+        key = (
+            "selection",
+            st.session_state.data_version,
+            str(st.session_state.filters),
+            x_axis,
+            y_axis,
+            str(sel.get("box")),
+            str(sel.get("lasso")),
         )
-        st.success(f"📍 {len(selected_df)} puntos.")
+        with profile("selection"):
+            selected_df = cached_view(
+                key,
+                lambda: full_selection(df, roles, x_axis, y_axis, sel, is_spatial),
+            )
+    if selected_df is None and sel.get("point_indices"):
+        selected_df = plot_df.iloc[sel["point_indices"]]
+
+    if selected_df is not None and len(selected_df) > 0:
+        with profile("metrics.selection"):
+            selection_metrics = generate_metrics(
+                selected_df, "SELECCIÓN", x_axis, y_axis, color_var, size_var
+            )
+        st.success(f"📍 {len(selected_df):,} puntos.")
     else:
         selection_metrics = {"Status": "Esperando selección..."}
         selected_df = pd.DataFrame()
 
+    export_fmt = st.selectbox(
+        "Formato de exportación", list(EXPORT_FORMATS), key="export_fmt"
+    )
+    ext, mime = EXPORT_FORMATS[export_fmt]
+    export_key = (
+        st.session_state.session_token,
+        st.session_state.data_version,
+        str(st.session_state.filters),
+    )
+    # La serialización corre al hacer clic, fuera de esta ejecución: va directo al log
+    export_wrap = None
+    if st.session_state.profiler is not None:
+        export_wrap = lambda name, fn: logged(  # noqa: E731
+            name, fn, st.session_state.session_token
+        )
+
     col_global, col_select = st.columns(2)
     with col_global:
         st.subheader("🌍 Global")
         st.json(global_metrics, expanded=True)
+        if store is not None:
+            chunks_fn = lambda: store.batches(filters)  # noqa: E731
+        else:
+            chunks_fn = lambda: frame_chunks(df)  # noqa: E731
         st.download_button(
-            "💾 Global CSV", df.to_csv(index=False).encode("utf-8"), "global.csv"
+            f"💾 Global {export_fmt}",
+            lazy_export(
+                export_key + ("global",), chunks_fn, export_fmt, wrap=export_wrap
+            ),
+            f"global.{ext}",
+            mime=mime,
         )
 
     with col_select:
@@ -188,8 +484,18 @@ def render_visuals(df, roles):
         if not selected_df.empty:
             if "_color_numeric" in selected_df.columns:
                 selected_df = selected_df.drop(columns=["_color_numeric"])
+            sel_key = export_key + ("select", str(sel), x_axis, y_axis)
+            # El índice de df_master es el id de fila original: se exporta
             st.download_button(
-                "💾 Selección CSV",
-                selected_df.to_csv(index=False).encode("utf-8"),
-                "select.csv",
+                f"💾 Selección {export_fmt}",
+                lazy_export(
+                    sel_key,
+                    lambda: frame_chunks(
+                        selected_df.rename_axis("row_id").reset_index()
+                    ),
+                    export_fmt,
+                    wrap=export_wrap,
+                ),
+                f"select.{ext}",
+                mime=mime,
             )
@@ -0,0 +1,47 @@
+"""core.derived: operadores por grupo y fórmulas contra su equivalente en pandas.
+
+Uso:
+    python -m unittest discover projects/atmos/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core import derived  # noqa: E402
+
+
+class CumsumTest(unittest.TestCase):
+    def test_nan_dentro_del_grupo(self):
+        values = np.array([1.0, np.nan, 2.0, 5.0, np.nan, 3.0, np.nan, 4.0])
+        by = np.array(["a", "a", "b", "a", "b", "b", "a", "b"])
+        esperado = pd.Series(values).groupby(by).cumsum().to_numpy()
+        np.testing.assert_array_equal(derived.cumsum(values, by=by), esperado)
+
+    def test_nan_sin_grupo(self):
+        values = np.array([np.nan, 1.0, np.nan, 2.0])
+        esperado = pd.Series(values).cumsum().to_numpy()
+        np.testing.assert_array_equal(derived.cumsum(values), esperado)
+
+
+class FormulaTest(unittest.TestCase):
+    def test_and_or_elemento_a_elemento(self):
+        df = pd.DataFrame({"a": [1.0, -1.0, 2.0, 3.0], "b": [3.0, 5.0, 1.0, 4.0]})
+        casos = {
+            "`a` > 0 and `b` > 2": (df.a > 0) & (df.b > 2),
+            "`a` > 2 or `b` > 4 or `a` < 0": (df.a > 2) | (df.b > 4) | (df.a < 0),
+        }
+        for texto, esperado in casos.items():
+            with self.subTest(formula=texto):
+                f = derived.compile_formula("f", texto, "numeric", set(df.columns))
+                obtenido = derived.evaluate(f, df)
+                np.testing.assert_array_equal(obtenido, esperado.astype(float))
+
+
+if __name__ == "__main__":
+    unittest.main()
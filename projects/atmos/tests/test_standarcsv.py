@@ -0,0 +1,157 @@
+"""Regresión de standarCSV: el motor vectorizado contra el bucle csv.DictReader original.
+
+Uso:
+    python -m unittest discover projects/atmos/tests
+"""
+
+import csv
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import standarCSV  # noqa: E402
+
+ENCABEZADO = "station,date,hour,temp,relative_humidity\n"
+
+CASOS = {
+    "dias_invalidos": (
+        "EST-1,31/02/2020,10:00:00,1,2\n"
+        "EST-1,00/01/2020,10:00:00,1,2\n"
+        "EST-1,29/02/2021,10:00:00,1,2\n"
+        "EST-1,29/02/2020,10:00:00,1,2\n"
+    ),
+    "horas_invalidas": (
+        "EST-1,01/01/2020,25:00:00,1,2\n"
+        "EST-1,01/01/2020,23:60:00,1,2\n"
+        "EST-1,01/01/2020,23:59:60,1,2\n"
+        "EST-1,01/01/2020,xx,1,2\n"
+        "EST-1,01/01/2020,23:59:59,1,2\n"
+    ),
+    "fechas_sin_ceros": (
+        "EST-1,1/2/2020,3:04:05,1,2\n"
+        "EST-1,01/02/2020,3:4:5,1,2\n"
+        "EST-1,1/12/2020,10:00:00,1,2\n"
+    ),
+    "fechas_con_espacios": (
+        "EST-1, 01/02/2020,10:00:00,1,2\n"
+        "EST-1,01/02/2020 ,10:00:00,1,2\n"
+        "EST-1,01/02/2020, 10:00:00,1,2\n"
+        "EST-1, 1/ 2/2020,10:00:00,1,2\n"
+    ),
+    "comillas": (
+        'EST-1,01/01/2020,00:00:00,"13,0","42,8"\n'
+        'EST-1,01/01/2020,00:01:00,"1,5",7\n'
+        'EST-1,01/01/2020,00:02:00,"a ""b"", c","x\ny"\n'
+        'EST-1,01/01/2020,00:03:00,"multi\nlínea,9",3\n'
+        "EST-1,01/01/2020,00:04:00,,\n"
+    ),
+}
+
+
+def procesar_referencia(input_file, output_file):
+    """Bucle original (csv.DictReader + strptime), sin cambios de comportamiento."""
+    print(f"Procesando: {input_file} -> {output_file}")
+    try:
+        with (
+            open(input_file, "r", encoding="utf-8") as infile,
+            open(output_file, "w", newline="", encoding="utf-8") as outfile,
+        ):
+            reader = csv.DictReader(infile)
+            fieldnames = ["timestamp", "temp", "relative_humidity"]
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+
+            count = 0
+            for row in reader:
+                try:
+                    fecha = row["date"]
+                    hora = row["hour"]
+                    dt = datetime.strptime(f"{fecha} {hora}", "%d/%m/%Y %H:%M:%S")
+                    timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
+                    temp = row["temp"].replace(",", ".")
+                    rh = row["relative_humidity"].replace(",", ".")
+                    writer.writerow(
+                        {"timestamp": timestamp, "temp": temp, "relative_humidity": rh}
+                    )
+                    count += 1
+                except ValueError as e:
+                    print(f"Error procesando fila {count + 1}: {e}")
+                    continue
+                except KeyError as e:
+                    print(f"Error: Columna faltante en el CSV de entrada: {e}")
+                    sys.exit(1)
+
+            print(f"Completado. {count} registros procesados.")
+
+    except FileNotFoundError:
+        print(f"Error: El archivo de entrada '{input_file}' no existe.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error inesperado: {e}")
+        sys.exit(1)
+
+
+class ProcesarCsvTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _correr(self, fn, contenido, **kwargs):
+        """(bytes de salida, log sin la línea 'Procesando', código de salida)."""
+        entrada = self.dir / "entrada.csv"
+        salida = self.dir / "salida.csv"
+        entrada.write_text(contenido, encoding="utf-8", newline="")
+        salida.unlink(missing_ok=True)
+        log = io.StringIO()
+        codigo = 0
+        with redirect_stdout(log):
+            try:
+                fn(entrada, salida, **kwargs)
+            except SystemExit as e:
+                codigo = e.code
+        datos = salida.read_bytes() if salida.exists() else None
+        return datos, log.getvalue().splitlines()[1:], codigo
+
+    def _comparar(self, contenido):
+        esperado = self._correr(procesar_referencia, contenido)
+        # Bloques de 2 filas: los errores caen a ambos lados de cada corte
+        for chunk_rows in (standarCSV.CHUNK_ROWS, 2):
+            with self.subTest(chunk_rows=chunk_rows):
+                obtenido = self._correr(
+                    standarCSV.procesar_csv, contenido, chunk_rows=chunk_rows
+                )
+                self.assertEqual(obtenido, esperado)
+
+    def test_casos(self):
+        for nombre, filas in CASOS.items():
+            with self.subTest(caso=nombre):
+                self._comparar(ENCABEZADO + filas)
+
+    def test_todos_los_casos_juntos(self):
+        self._comparar(ENCABEZADO + "".join(CASOS.values()))
+
+    def test_columna_faltante(self):
+        self._comparar("station,date,temp,relative_humidity\nEST-1,01/01/2020,1,2\n")
+
+    def test_sin_columnas_esperadas(self):
+        # Export con ';': ninguna columna esperada, el bloque no tiene columnas
+        self._comparar(
+            "station;date;hour;temp;relative_humidity\nEST-1;01/01/2020;10:00:00;1;2\n"
+        )
+        self._comparar("station,fecha\nEST-1,01/01/2020\n")
+
+    def test_columna_faltante_sin_filas(self):
+        self._comparar("station,date,temp,relative_humidity\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,133 @@
 import argparse
 import csv
 import json
+import os
+import re
 import sys
+import tempfile
 from pathlib import Path
 
+# --- PARTE 1: Lectura incremental del JSON de logs ---
+_WS = re.compile(r"[ \t\n\r]*")
+_SIGUE_NUMERO = frozenset("0123456789.eE+-")
+# Un error a menos de esto del final puede ser un valor cortado por la ventana
+# ("fals", "-", "\\u12" dentro de un string); más atrás es JSON inválido
+_COLA_INCOMPLETA = 6
+BLOQUE_LECTURA = 1024**2  # caracteres leídos por vez
+FILAS_POR_ESCRITURA = 10_000
+
+
+class FlujoJSON:
+    """Recorre un JSON de texto sin cargarlo entero (ventana de BLOQUE_LECTURA).
+
+    Los valores pequeños (cada log, el id) se decodifican con raw_decode;
+    la estructura exterior se recorre carácter a carácter.
+    """
+
+    def __init__(self, f, bloque=BLOQUE_LECTURA):
+        self.f = f
+        self.bloque = bloque
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _leer(self):
+        chunk = self.f.read(self.bloque)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def siguiente(self):
+        """Próximo carácter significativo, sin consumirlo ('' al final)."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._leer():
+                return ""
+
+    def consumir(self, esperados):
+        c = self.siguiente()
+        if not c or c not in esperados:
+            raise json.JSONDecodeError(
+                f"Se esperaba uno de {esperados!r}", self.buf, self.pos
+            )
+        self.pos += 1
+        return c
+
+    def terminar(self):
+        """Tras el valor raíz solo se admiten espacios (como json.load)."""
+        if self.siguiente():
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
+
+    def valor(self):
+        self.siguiente()
+        while True:
+            try:
+                v, fin = self.decoder.raw_decode(self.buf, self.pos)
+                # Un número al borde de la ventana podría seguir en el próximo bloque
+                if self.eof or (
+                    fin < len(self.buf) and self.buf[fin] not in _SIGUE_NUMERO
+                ):
+                    self.pos = fin
+                    return v
+            except json.JSONDecodeError as e:
+                # Un string sin cerrar apunta a su comilla inicial: solo más
+                # texto puede cerrarlo
+                sin_cerrar = e.msg.startswith("Unterminated string")
+                cortado = sin_cerrar or e.pos >= len(self.buf) - _COLA_INCOMPLETA
+                if self.eof or not cortado:
+                    raise
+            self._leer()
+
+
+def recorrer_gps_logs(flujo):
+    """Eventos de [{id, gps_logs: [...]}, ...] en orden de aparición.
+
+    ("id", valor), ("log", dict) por punto, ("gps_logs", None) al cerrar la
+    lista y ("fin", None) al cerrar cada vehículo.
+    """
+    flujo.consumir("[")
+    if flujo.siguiente() == "]":
+        flujo.pos += 1
+        flujo.terminar()
+        return
+    while True:
+        flujo.consumir("{")
+        cerrado = flujo.siguiente() == "}"
+        if cerrado:
+            flujo.pos += 1
+        while not cerrado:
+            clave = flujo.valor()
+            flujo.consumir(":")
+            if clave == "gps_logs":
+                flujo.consumir("[")
+                if flujo.siguiente() == "]":
+                    flujo.pos += 1
+                else:
+                    while True:
+                        yield "log", flujo.valor()
+                        if flujo.consumir(",]") == "]":
+                            break
+                yield "gps_logs", None
+            elif clave == "id":
+                yield "id", flujo.valor()
+            else:
+                flujo.valor()
+            cerrado = flujo.consumir(",}") == "}"
+        yield "fin", None
+        if flujo.consumir(",]") == "]":
+            flujo.terminar()
+            return
+
+
+def _fila(log):
+    return (log["t"], log["x"], log["y"], log["z"], log["speed"])
+
 
 # --- PARTE 2: Combinar logs de GPS con nombres de vehículos ---
 def combinar_logs_con_nombres(gpslogs_json_path, vehiculos_json_path, output_csv_path):
@@ -11,42 +135,35 @@ def combinar_logs_con_nombres(gpslogs_json_path, vehiculos_json_path, output_csv
         print(f"Combinando logs de: {gpslogs_json_path}")
         print(f"Usando nombres de: {vehiculos_json_path}")
 
-        # Cargar archivos JSON
-        with open(gpslogs_json_path, "r", encoding="utf-8") as f:
-            gpslogs_json = json.load(f)
+        # Los metadatos son pequeños: se cargan completos
         with open(vehiculos_json_path, "r", encoding="utf-8") as f:
             vehiculos_json = json.load(f)
 
         # Crear un diccionario id -> name
         id2name = {v["id"]: v["name"] for v in vehiculos_json}
 
-        # Procesar logs
-        registros = []
-        for veh in gpslogs_json:
-            veh_id = veh["id"]
-            nombre = id2name.get(veh_id, f"id_{veh_id}")
-            for log in veh["gps_logs"]:
-                registro = {
-                    "vehiculo_id": veh_id,
-                    "vehiculo_nombre": nombre,
-                    "t": log["t"],
-                    "x": log["x"],
-                    "y": log["y"],
-                    "z": log["z"],
-                    "speed": log["speed"],
-                }
-                registros.append(registro)
-
-        # Escribir CSV
+        # Escribir CSV a un temporal: si algo falla no queda un CSV a medias
         campos = ["vehiculo_id", "vehiculo_nombre", "t", "x", "y", "z", "speed"]
-        with open(output_csv_path, "w", newline="", encoding="utf-8") as fout:
-            writer = csv.DictWriter(fout, fieldnames=campos)
-            writer.writeheader()
-            for reg in registros:
-                writer.writerow(reg)
+        output_csv_path = Path(output_csv_path)
+        tmp = output_csv_path.with_name(f".{output_csv_path.name}.tmp")
+        total = 0
+        try:
+            with (
+                open(gpslogs_json_path, "r", encoding="utf-8") as fin,
+                open(tmp, "w", newline="", encoding="utf-8") as fout,
+            ):
+                writer = csv.writer(fout)
+                writer.writerow(campos)
+                total = _escribir_registros(
+                    recorrer_gps_logs(FlujoJSON(fin)), id2name, writer
+                )
+            os.replace(tmp, output_csv_path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
 
         print(f"Exportado correctamente a: {output_csv_path}")
-        print(f"Total registros: {len(registros)}")
+        print(f"Total registros: {total}")
 
     except FileNotFoundError as e:
         print(f"Error: No se encontró el archivo: {e.filename}")
@@ -59,6 +176,58 @@ def combinar_logs_con_nombres(gpslogs_json_path, vehiculos_json_path, output_csv
         sys.exit(1)
 
 
+def _escribir_registros(eventos, id2name, writer):
+    """Escribe por lotes de FILAS_POR_ESCRITURA; devuelve el total de filas.
+
+    Si gps_logs aparece antes que id, los puntos van a un temporal hasta
+    conocer el vehículo (la memoria no depende del largo de la lista).
+    """
+    total = 0
+    lote = []
+    veh_id = spool = None
+    con_id = con_logs = False
+    for tipo, valor in eventos:
+        if tipo == "log":
+            if con_id:
+                lote.append(
+                    (veh_id, id2name.get(veh_id, f"id_{veh_id}")) + _fila(valor)
+                )
+                if len(lote) >= FILAS_POR_ESCRITURA:
+                    writer.writerows(lote)
+                    lote.clear()
+            else:
+                if spool is None:
+                    spool = tempfile.TemporaryFile("w+", newline="", encoding="utf-8")
+                    spool_writer = csv.writer(spool)
+                spool_writer.writerow(_fila(valor))
+            total += 1
+        elif tipo == "id":
+            veh_id, con_id = valor, True
+        elif tipo == "gps_logs":
+            con_logs = True
+        elif tipo == "fin":
+            if not con_id:
+                raise KeyError("id")
+            if not con_logs:
+                raise KeyError("gps_logs")
+            if spool is not None:
+                writer.writerows(lote)
+                lote.clear()
+                nombre = id2name.get(veh_id, f"id_{veh_id}")
+                spool.seek(0)
+                for fila in csv.reader(spool):
+                    lote.append([veh_id, nombre] + fila)
+                    if len(lote) >= FILAS_POR_ESCRITURA:
+                        writer.writerows(lote)
+                        lote.clear()
+                spool.close()
+                spool = None
+            veh_id = None
+            con_id = con_logs = False
+    writer.writerows(lote)
+    return total
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Herramienta para combinar logs de GPS con nombres de palas."